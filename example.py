@@ -3,8 +3,7 @@
 
 import sys
 import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
-
+import shutil
 import anyio
 from flow import create_simple_coding_flow
 
@@ -51,13 +50,28 @@ async def main():
             # Show the created files
             if summary.get('files_created'):
                 print("\n📄 Created files content:")
+                # One readdir gives us every entry (with cached stat info)
+                # instead of a join + exists stat per created file
+                entries = {e.name: e for e in os.scandir("./test-output")}
                 for file_path in summary['files_created']:
-                    full_path = os.path.join("./test-output", file_path)
-                    if os.path.exists(full_path):
-                        print(f"\n--- {file_path} ---")
-                        with open(full_path, 'r') as f:
-                            print(f.read())
-                        print("---\n")
+                    entry = entries.get(file_path)
+                    if entry is not None and entry.is_file():
+                        full_path = entry.path
+                    else:
+                        # Absolute paths and subdirectory entries aren't
+                        # top-level names; fall back to the per-file stat
+                        full_path = file_path if os.path.isabs(file_path) \
+                            else os.path.join("./test-output", file_path)
+                        if not os.path.isfile(full_path):
+                            continue
+                    print(f"\n--- {file_path} ---")
+                    # Stream in binary chunks instead of loading the
+                    # whole file into memory with f.read()
+                    sys.stdout.flush()
+                    with open(full_path, 'rb', buffering=64*1024) as f:
+                        shutil.copyfileobj(f, sys.stdout.buffer)
+                    sys.stdout.buffer.flush()
+                    print("\n---\n")
                         
     except Exception as e:
         print(f"\n❌ Error: {e}")
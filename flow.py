@@ -1,13 +1,16 @@
 """Flow orchestration for Claude Code Subagent."""
 
-import sys
 import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+import collections
+import functools
+from dataclasses import dataclass
 
 from pocketflow import AsyncFlow
 from nodes import (
+    IterationBudget,
     UnderstandRequirements,
     AnalyzeContext,
+    UnderstandAndAnalyze,
     DecideAction,
     CreatePlan,
     ImplementCode,
@@ -18,108 +21,18 @@ from nodes import (
 from utils.logger import AgentLogger, ProgressReporter
 
 
-def create_coding_agent_flow():
-    """Create and configure the coding agent flow."""
-    
-    # Create node instances with retry configuration
-    understand = UnderstandRequirements(max_retries=2, wait=1)
-    analyze = AnalyzeContext(max_retries=2)
-    decide = DecideAction(max_retries=3, wait=2)
-    plan = CreatePlan(max_retries=2, wait=1)
-    implement = ImplementCode(max_retries=3, wait=2)
-    test = TestImplementation(max_retries=2, wait=1)
-    refactor = RefactorCode(max_retries=2, wait=1)
-    finalize = FinalizeProject()
-    
-    # Define the flow connections
-    # Start with understanding requirements
-    understand >> analyze >> decide
-    
-    # Decision node branches to different actions
-    decide - "plan" >> plan
-    decide - "implement" >> implement
-    decide - "test" >> test
-    decide - "refactor" >> refactor
-    decide - "complete" >> finalize
-    
-    # After each action, loop back to decide (except finalize)
-    plan >> decide
-    implement >> decide
-    test >> decide
-    refactor >> decide
-    
-    # Handle error cases
-    implement - "error" >> refactor
-    
-    # Create the flow starting with understanding requirements
-    flow = AsyncFlow(start=understand)
-    
-    return flow
-
-
-def create_simple_coding_flow():
-    """Create a simplified linear flow for straightforward tasks."""
-    
-    # Create nodes
-    understand = UnderstandRequirements()
-    analyze = AnalyzeContext()
-    plan = CreatePlan()
-    implement = ImplementCode()
-    test = TestImplementation()
-    finalize = FinalizeProject()
-    
-    # Simple linear flow
-    understand >> analyze >> plan >> implement >> test >> finalize
-    
-    flow = AsyncFlow(start=understand)
-    
-    return flow
-
-
-def create_iterative_coding_flow():
-    """Create an iterative flow with multiple implementation cycles."""
-    
-    # Create nodes with higher retry counts for robustness
-    decide = DecideAction(max_retries=5, wait=1)
-    plan = CreatePlan(max_retries=3)
-    implement = ImplementCode(max_retries=5, wait=2)
-    test = TestImplementation(max_retries=3)
-    refactor = RefactorCode(max_retries=3)
-    finalize = FinalizeProject()
-    
-    # Start with decision making
-    # This flow assumes requirements are already in shared store
-    
-    # Decision branches
-    decide - "plan" >> plan
-    decide - "implement" >> implement
-    decide - "test" >> test
-    decide - "refactor" >> refactor
-    decide - "complete" >> finalize
-    
-    # All actions loop back to decide for next iteration
-    plan >> decide
-    implement >> decide
-    test >> decide
-    refactor >> decide
-    
-    flow = AsyncFlow(start=decide)
-    
-    return flow
-
-
 class CodingAgentFlow(AsyncFlow):
     """Main coding agent flow with built-in state management and logging."""
-    
+
     def __init__(self, start=None, enable_logging=True):
         """Initialize with optional logging."""
         super().__init__(start)
         self.enable_logging = enable_logging
         self.logger = None
-        
+
     async def prep_async(self, shared):
         """Initialize the shared store with default values."""
-        
+
         # Initialize logger
         if self.enable_logging:
             self.logger = AgentLogger()
@@ -128,11 +41,11 @@ class CodingAgentFlow(AsyncFlow):
                 "task": shared.get("task", "Unknown task"),
                 "project_path": shared.get("context", {}).get("project_path", ".")
             })
-        
+
         # Set default values if not present
         if "state" not in shared:
             shared["state"] = "initial"
-        
+
         if "context" not in shared:
             shared["context"] = {
                 "project_path": os.getcwd(),
@@ -140,7 +53,7 @@ class CodingAgentFlow(AsyncFlow):
                 "dependencies": {},
                 "constraints": []
             }
-        
+
         if "implementation" not in shared:
             shared["implementation"] = {
                 "files_created": [],
@@ -148,33 +61,54 @@ class CodingAgentFlow(AsyncFlow):
                 "tool_uses": [],
                 "errors": []
             }
-        
-        if "history" not in shared:
-            shared["history"] = []
-        
+
         if "max_iterations" not in shared:
             shared["max_iterations"] = 10
-        
-        # Track iterations to prevent infinite loops
-        shared["current_iteration"] = 0
-        
+
+        # History is a bounded ring buffer so long agent loops never pay
+        # O(n) list copies; the FSM mirrors per-action totals for O(1)
+        # transitions at the decision point
+        if not isinstance(shared.get("history"), collections.deque):
+            shared["history"] = collections.deque(
+                shared.get("history") or (),
+                maxlen=shared["max_iterations"] * 2
+            )
+        if "fsm" not in shared:
+            fsm = {"plan_tries": 0, "impl_tries": 0, "test_tries": 0, "last_action": None}
+            for h in shared["history"]:
+                action = h.get("action")
+                if action == "plan":
+                    fsm["plan_tries"] += 1
+                elif action == "implement":
+                    fsm["impl_tries"] += 1
+                elif action == "test":
+                    fsm["test_tries"] += 1
+                fsm["last_action"] = action
+            shared["fsm"] = fsm
+
+        # Countdown budget prevents infinite decision loops
+        shared["budget"] = IterationBudget(
+            remaining=shared["max_iterations"],
+            total=shared["max_iterations"]
+        )
+
         return None
-    
+
     async def post_async(self, shared, prep_res, exec_res):
         """Finalize the flow and clean up."""
-        
+
         # Log final state
         print("\n" + "="*50)
         print("Coding Agent Flow Complete")
         print("="*50)
         print(f"Final state: {shared.get('state', 'unknown')}")
         print(f"Total iterations: {len(shared.get('history', []))}")
-        
+
         if shared.get("summary"):
             summary = shared["summary"]
             print(f"Files created: {len(summary.get('files_created', []))}")
             print(f"Status: {summary.get('status', 'unknown')}")
-        
+
         # Generate and show shareable report
         if self.logger:
             self.logger.log_event("session_completed", {
@@ -182,73 +116,196 @@ class CodingAgentFlow(AsyncFlow):
                 "files_created": shared.get("summary", {}).get('files_created', []),
                 "total_iterations": len(shared.get('history', []))
             })
-            
+
+            # Drain the background writer so every queued event is on disk
+            # before the report reads the log, and so nothing is dropped
+            # when the loop shuts down after this flow returns
+            await self.logger.aclose()
+
             report = self.logger.generate_markdown_report()
             shareable = self.logger.get_shareable_link()
             print(shareable)
-        
+
         return exec_res
 
 
+# Node classes addressable from flow specs
+_NODE_CLASSES = {
+    "understand": UnderstandRequirements,
+    "analyze": AnalyzeContext,
+    "prepare": UnderstandAndAnalyze,
+    "decide": DecideAction,
+    "plan": CreatePlan,
+    "implement": ImplementCode,
+    "test": TestImplementation,
+    "refactor": RefactorCode,
+    "finalize": FinalizeProject
+}
+
+
+@dataclass(frozen=True)
+class FlowSpec:
+    """Hashable description of a flow graph.
+
+    Attributes:
+        nodes: Tuple of (name, constructor kwargs as key/value pairs)
+        edges: Tuple of (source, action or None for default, target)
+        start: Name of the starting node
+        flow_class: Flow class to instantiate for this spec
+    """
+    nodes: tuple
+    edges: tuple
+    start: str
+    flow_class: type = AsyncFlow
+
+
+# The decision loop shared by the branching flows
+_DECISION_EDGES = (
+    ("decide", "plan", "plan"),
+    ("decide", "implement", "implement"),
+    ("decide", "test", "test"),
+    ("decide", "refactor", "refactor"),
+    ("decide", "complete", "finalize"),
+    ("plan", None, "decide"),
+    ("implement", None, "decide"),
+    ("test", None, "decide"),
+    ("refactor", None, "decide")
+)
+
+STANDARD_SPEC = FlowSpec(
+    nodes=(
+        ("prepare", (("max_retries", 2), ("wait", 1))),
+        ("decide", (("max_retries", 3), ("wait", 2))),
+        ("plan", (("max_retries", 2), ("wait", 1))),
+        ("implement", (("max_retries", 3), ("wait", 2))),
+        ("test", (("max_retries", 2), ("wait", 1))),
+        ("refactor", (("max_retries", 2), ("wait", 1))),
+        ("finalize", ())
+    ),
+    edges=(
+        ("prepare", None, "decide"),
+    ) + _DECISION_EDGES + (
+        ("implement", "error", "refactor"),
+    ),
+    start="prepare"
+)
+
+SIMPLE_SPEC = FlowSpec(
+    nodes=(
+        ("prepare", ()),
+        ("plan", ()),
+        ("implement", ()),
+        ("test", ()),
+        ("finalize", ())
+    ),
+    edges=(
+        ("prepare", None, "plan"),
+        ("plan", None, "implement"),
+        ("implement", None, "test"),
+        ("test", None, "finalize")
+    ),
+    start="prepare"
+)
+
+# Assumes requirements are already in the shared store
+ITERATIVE_SPEC = FlowSpec(
+    nodes=(
+        ("decide", (("max_retries", 5), ("wait", 1))),
+        ("plan", (("max_retries", 3),)),
+        ("implement", (("max_retries", 5), ("wait", 2))),
+        ("test", (("max_retries", 3),)),
+        ("refactor", (("max_retries", 3),)),
+        ("finalize", ())
+    ),
+    edges=_DECISION_EDGES,
+    start="decide"
+)
+
+ADVANCED_SPEC = FlowSpec(
+    nodes=(
+        ("prepare", (("max_retries", 2),)),
+        ("decide", (("max_retries", 3),)),
+        ("plan", (("max_retries", 2),)),
+        ("implement", (("max_retries", 5), ("wait", 2))),
+        ("test", (("max_retries", 3),)),
+        ("refactor", (("max_retries", 3),)),
+        ("finalize", ())
+    ),
+    edges=(
+        ("prepare", None, "decide"),
+    ) + _DECISION_EDGES + (
+        ("implement", "error", "refactor"),
+    ),
+    start="prepare",
+    flow_class=CodingAgentFlow
+)
+
+
+@functools.lru_cache(maxsize=8)
+def _build_flow(spec: FlowSpec):
+    """Instantiate and wire a flow from its spec, caching per spec.
+
+    The orchestrator shallow-copies nodes on every step, so a wired graph
+    is safe to reuse across runs; caching amortizes node construction and
+    edge wiring over repeated create_flow_for_task calls.
+    """
+    nodes = {
+        name: _NODE_CLASSES[name](**dict(kwargs))
+        for name, kwargs in spec.nodes
+    }
+
+    for source, action, target in spec.edges:
+        if action is None:
+            nodes[source] >> nodes[target]
+        else:
+            nodes[source] - action >> nodes[target]
+
+    return spec.flow_class(start=nodes[spec.start])
+
+
+def create_coding_agent_flow():
+    """Create and configure the coding agent flow."""
+    return _build_flow(STANDARD_SPEC)
+
+
+def create_simple_coding_flow():
+    """Create a simplified linear flow for straightforward tasks."""
+    return _build_flow(SIMPLE_SPEC)
+
+
+def create_iterative_coding_flow():
+    """Create an iterative flow with multiple implementation cycles."""
+    return _build_flow(ITERATIVE_SPEC)
+
+
 def create_advanced_coding_flow():
     """Create the advanced coding agent flow with full capabilities."""
-    
-    # Create all nodes
-    understand = UnderstandRequirements(max_retries=2)
-    analyze = AnalyzeContext(max_retries=2)
-    decide = DecideAction(max_retries=3)
-    plan = CreatePlan(max_retries=2)
-    implement = ImplementCode(max_retries=5, wait=2)
-    test = TestImplementation(max_retries=3)
-    refactor = RefactorCode(max_retries=3)
-    finalize = FinalizeProject()
-    
-    # Build the complete flow
-    understand >> analyze >> decide
-    
-    # Decision tree
-    decide - "plan" >> plan
-    decide - "implement" >> implement  
-    decide - "test" >> test
-    decide - "refactor" >> refactor
-    decide - "complete" >> finalize
-    
-    # Loops back to decision
-    plan >> decide
-    implement >> decide
-    test >> decide
-    refactor >> decide
-    
-    # Error handling
-    implement - "error" >> refactor
-    
-    # Create custom flow class
-    flow = CodingAgentFlow(start=understand)
-    
-    return flow
+    return _build_flow(ADVANCED_SPEC)
+
+
+# Complexity -> factory; "medium" and unknown values use the default flow
+_FLOW_FACTORIES = {
+    "simple": create_simple_coding_flow,
+    "complex": create_advanced_coding_flow
+}
 
 
 # Helper function to create flow based on complexity
 def create_flow_for_task(task_complexity: str = "medium"):
     """
     Create appropriate flow based on task complexity.
-    
+
     Args:
         task_complexity: "simple", "medium", or "complex"
-        
+
     Returns:
         Configured AsyncFlow instance
     """
-    if task_complexity == "simple":
-        return create_simple_coding_flow()
-    elif task_complexity == "complex":
-        return create_advanced_coding_flow()
-    else:  # medium
-        return create_coding_agent_flow()
+    return _FLOW_FACTORIES.get(task_complexity, create_coding_agent_flow)()
 
 
 if __name__ == "__main__":
     # Example: Create a flow
     flow = create_coding_agent_flow()
     print("Coding agent flow created successfully!")
-    print("Use flow.run_async(shared) to execute the flow")
\ No newline at end of file
+    print("Use flow.run_async(shared) to execute the flow")
@@ -2,8 +2,6 @@
 
 import sys
 import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
-
 import anyio
 import argparse
 from pathlib import Path
@@ -19,13 +17,17 @@ async def run_coding_agent(task: str, project_path: str = ".", complexity: str =
         project_path: Path to the project directory
         complexity: Task complexity ("simple", "medium", "complex")
     """
-    print("="*60)
-    print("🤖 Claude Code Subagent - Agentic Coding Assistant")
-    print("="*60)
-    print(f"Task: {task}")
-    print(f"Project Path: {project_path}")
-    print(f"Complexity: {complexity}")
-    print("="*60 + "\n")
+    # Emit the banner in a single write instead of one syscall per line
+    sys.stdout.write(
+        "="*60 + "\n"
+        "🤖 Claude Code Subagent - Agentic Coding Assistant\n"
+        + "="*60 + "\n"
+        f"Task: {task}\n"
+        f"Project Path: {project_path}\n"
+        f"Complexity: {complexity}\n"
+        + "="*60 + "\n\n"
+    )
+    sys.stdout.flush()
     
     # Create project directory if it doesn't exist
     os.makedirs(project_path, exist_ok=True)
@@ -48,28 +50,26 @@ async def run_coding_agent(task: str, project_path: str = ".", complexity: str =
     flow = create_flow_for_task(complexity)
     
     try:
-        # Run the flow
         await flow.run_async(shared)
-        
-        # Display results
+
+        # Display results, buffered into a single write
         if shared.get("summary"):
-            print("\n" + "="*60)
-            print("✨ Task Completed Successfully!")
-            print("="*60)
             summary = shared["summary"]
-            
+            out = ["\n" + "="*60, "✨ Task Completed Successfully!", "="*60]
+
             if summary.get("files_created"):
-                print("\n📁 Files Created:")
-                for file in summary["files_created"]:
-                    print(f"  • {file}")
-            
+                out.append("\n📁 Files Created:")
+                out.extend(f"  • {file}" for file in summary["files_created"])
+
             if summary.get("files_modified"):
-                print("\n✏️ Files Modified:")
-                for file in summary["files_modified"]:
-                    print(f"  • {file}")
-            
-            print(f"\n📊 Total Actions: {summary.get('total_actions', 0)}")
-            print(f"✅ Tests: {'Passed' if summary.get('tests_passed') else 'Failed or Not Run'}")
+                out.append("\n✏️ Files Modified:")
+                out.extend(f"  • {file}" for file in summary["files_modified"])
+
+            out.append(f"\n📊 Total Actions: {summary.get('total_actions', 0)}")
+            out.append(f"✅ Tests: {'Passed' if summary.get('tests_passed') else 'Failed or Not Run'}")
+
+            sys.stdout.write("\n".join(out) + "\n")
+            sys.stdout.flush()
         else:
             print("\n⚠️ Task completed but no summary generated")
     
@@ -83,11 +83,14 @@ async def run_coding_agent(task: str, project_path: str = ".", complexity: str =
 
 async def interactive_mode():
     """Run the agent in interactive mode."""
-    print("="*60)
-    print("🤖 Claude Code Subagent - Interactive Mode")
-    print("="*60)
-    print("Enter your coding task (or 'quit' to exit)")
-    print("="*60 + "\n")
+    sys.stdout.write(
+        "="*60 + "\n"
+        "🤖 Claude Code Subagent - Interactive Mode\n"
+        + "="*60 + "\n"
+        "Enter your coding task (or 'quit' to exit)\n"
+        + "="*60 + "\n\n"
+    )
+    sys.stdout.flush()
     
     while True:
         task = input("Task> ").strip()
@@ -117,38 +120,47 @@ async def interactive_mode():
         print("\n" + "="*60 + "\n")
 
 
-async def main():
-    """Main function with argument parsing."""
+def _build_parser() -> argparse.ArgumentParser:
+    """Build the command-line argument parser."""
     parser = argparse.ArgumentParser(
         description="Claude Code Subagent - Automated coding assistant using PocketFlow and Claude Code SDK"
     )
-    
+
     parser.add_argument(
         "task",
         nargs="?",
         help="The coding task to accomplish"
     )
-    
+
     parser.add_argument(
         "-p", "--path",
         default=".",
         help="Project path (default: current directory)"
     )
-    
+
     parser.add_argument(
         "-c", "--complexity",
         choices=["simple", "medium", "complex"],
         default="medium",
         help="Task complexity level (default: medium)"
     )
-    
+
     parser.add_argument(
         "-i", "--interactive",
         action="store_true",
         help="Run in interactive mode"
     )
-    
-    args = parser.parse_args()
+
+    return parser
+
+
+# Built once at import so repeated main() invocations reuse it
+_PARSER = _build_parser()
+
+
+async def main():
+    """Main function with argument parsing."""
+    args = _PARSER.parse_args()
     
     if args.interactive or not args.task:
         await interactive_mode()
@@ -165,15 +177,15 @@ EXAMPLE_TASKS = {
     "complex": "Build a REST API for a note-taking app with CRUD operations, using FastAPI and SQLite"
 }
 
+# Rendered once at import so print_examples is a single write
+_EXAMPLE_BANNER = "\n📚 Example Tasks:\n" + "="*60 + "\n" + \
+    "\n".join(f"\n{complexity.upper()}:\n  {task}" for complexity, task in EXAMPLE_TASKS.items()) + \
+    "\n" + "="*60 + "\n"
+
 
 def print_examples():
     """Print example tasks."""
-    print("\n📚 Example Tasks:")
-    print("="*60)
-    for complexity, task in EXAMPLE_TASKS.items():
-        print(f"\n{complexity.upper()}:")
-        print(f"  {task}")
-    print("="*60)
+    sys.stdout.write(_EXAMPLE_BANNER)
 
 
 if __name__ == "__main__":
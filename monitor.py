@@ -2,72 +2,49 @@
 """Web dashboard for monitoring Claude Code Subagent progress."""
 
 import sys
-import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+import mmap
+import hashlib
+import collections
 
-import json
+import orjson
+from cachetools import LRUCache
 from pathlib import Path
 from datetime import datetime
 import asyncio
 from aiohttp import web
-import aiohttp_cors
 
 
-class AgentMonitor:
-    """Web dashboard for monitoring agent progress."""
-    
-    def __init__(self, port: int = 8080, log_dir: str = "./logs"):
-        self.port = port
-        self.log_dir = Path(log_dir)
-        self.current_session = None
-        self.sessions = []
-        
-    async def start(self):
-        """Start the web server."""
-        app = web.Application()
-        
-        # Configure CORS
-        cors = aiohttp_cors.setup(app, defaults={
-            "*": aiohttp_cors.ResourceOptions(
-                allow_credentials=True,
-                expose_headers="*",
-                allow_headers="*"
-            )
-        })
-        
-        # Routes
-        app.router.add_get('/', self.handle_index)
-        app.router.add_get('/api/sessions', self.handle_sessions)
-        app.router.add_get('/api/session/{session_id}', self.handle_session)
-        app.router.add_get('/api/current', self.handle_current)
-        app.router.add_post('/api/webhook', self.handle_webhook)
-        
-        # Apply CORS to all routes
-        for route in list(app.router.routes()):
-            cors.add(route)
-        
-        runner = web.AppRunner(app)
-        await runner.setup()
-        site = web.TCPSite(runner, 'localhost', self.port)
-        await site.start()
-        
-        print(f"""
-🌐 Claude Code Subagent Monitor Started!
-========================================
-Dashboard: http://localhost:{self.port}
-API Endpoint: http://localhost:{self.port}/api/
-Webhook URL: http://localhost:{self.port}/api/webhook
+_CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Headers': '*',
+    'Access-Control-Allow-Credentials': 'true',
+    'Access-Control-Expose-Headers': '*'
+}
 
-Set this in your environment:
-export AGENT_WEBHOOK_URL="http://localhost:{self.port}/api/webhook"
-""")
-        
-        # Keep running
-        await asyncio.Event().wait()
-    
-    async def handle_index(self, request):
-        """Serve the dashboard HTML."""
-        html = """
+
+@web.middleware
+async def _cors_middleware(request, handler):
+    """Set CORS headers without the per-route aiohttp_cors wrappers."""
+    if request.method == 'OPTIONS':
+        return web.Response(headers=_CORS_HEADERS)
+
+    response = await handler(request)
+    response.headers.update(_CORS_HEADERS)
+    return response
+
+
+def _json_response(obj, status=200):
+    """Serialize a response body with orjson (C extension, much faster than stdlib json)."""
+    return web.Response(
+        body=orjson.dumps(obj),
+        status=status,
+        content_type='application/json'
+    )
+
+
+# Dashboard page, encoded once at import so every request reuses the same
+# bytes instead of re-encoding a ~10KB string
+_DASHBOARD_HTML = """
 <!DOCTYPE html>
 <html>
 <head>
@@ -350,71 +327,306 @@ export AGENT_WEBHOOK_URL="http://localhost:{self.port}/api/webhook"
         // Initial load
         loadSessions();
         checkCurrent();
-        
-        // Auto-refresh
-        setInterval(() => {
-            if (autoRefresh) {
-                checkCurrent();
-                if (currentSession) {
-                    loadSession(currentSession);
+
+        if ('WebSocket' in window) {
+            // Server pushes webhook events as they arrive; no polling needed
+            const ws = new WebSocket(`ws://${location.host}/ws`);
+            ws.onmessage = async (e) => {
+                if (!autoRefresh) return;
+                const data = JSON.parse(e.data);
+                await checkCurrent();
+                if (data.session_id) {
+                    await loadSession(data.session_id);
                 }
-            }
-        }, 2000);
+            };
+        } else {
+            // Fallback polling for browsers without WebSocket support
+            setInterval(() => {
+                if (autoRefresh) {
+                    checkCurrent();
+                    if (currentSession) {
+                        loadSession(currentSession);
+                    }
+                }
+            }, 2000);
+        }
     </script>
 </body>
 </html>
 """
-        return web.Response(text=html, content_type='text/html')
+
+_INDEX_BODY = _DASHBOARD_HTML.encode('utf-8')
+_INDEX_ETAG = hashlib.md5(_INDEX_BODY).hexdigest()
+
+
+class AgentMonitor:
+    """Web dashboard for monitoring agent progress."""
     
-    async def handle_sessions(self, request):
-        """Return list of all sessions."""
-        sessions = []
+    def __init__(self, port: int = 8080, log_dir: str = "./logs"):
+        self.port = port
+        self.log_dir = Path(log_dir)
+        self.current_session = None
+        self.sessions = []
+        # session_id -> metadata, built once at startup and updated by webhooks,
+        # so /api/sessions polls never re-read the log files from disk
+        self._session_index = {}
+        # (session_id, mtime_ns) -> serialized detail body. Bounded so a
+        # long-running dashboard keeps hot sessions in RAM without
+        # accumulating every session ever served; cold ones fall back to disk
+        self._detail_cache = LRUCache(maxsize=128)
+        # session_id -> (byte offset, assembled log) for incremental NDJSON
+        # reads, bounded for the same reason
+        self._offsets = LRUCache(maxsize=128)
+        # Connected dashboard WebSockets that receive pushed webhook events
+        self._ws_clients = set()
+        # Bound binary writer for the per-webhook log line: one attribute
+        # lookup per event instead of the full print formatting path
+        self._emit = sys.stdout.buffer.write
+        # Ring buffer of recent webhook body digests so agent retries that
+        # replay an identical POST are dropped instead of reprocessed and
+        # re-broadcast; the set mirrors the deque for O(1) membership
+        self._recent_events = collections.deque(maxlen=1024)
+        self._recent_set = set()
+
+    async def start(self):
+        """Start the web server."""
+        # Build the session index before serving requests
+        await self._scan_logs()
+
+        app = web.Application(middlewares=[_cors_middleware])
+
+        # Routes
+        app.router.add_get('/', self.handle_index)
+        app.router.add_get('/api/sessions', self.handle_sessions)
+        app.router.add_get('/api/session/{session_id}', self.handle_session)
+        app.router.add_get('/api/current', self.handle_current)
+        app.router.add_post('/api/webhook', self.handle_webhook)
+        app.router.add_get('/ws', self.handle_ws)
+
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, 'localhost', self.port)
+        await site.start()
         
-        if self.log_dir.exists():
-            for log_file in self.log_dir.glob("agent_log_*.json"):
-                try:
-                    with open(log_file, 'r') as f:
-                        data = json.load(f)
-                        sessions.append({
-                            "session_id": data["session_id"],
-                            "start_time": data.get("start_time", "Unknown"),
-                            "task": data.get("events", [{}])[0].get("data", {}).get("task", "Unknown")
-                        })
-                except:
-                    pass
+        print(f"""
+🌐 Claude Code Subagent Monitor Started!
+========================================
+Dashboard: http://localhost:{self.port}
+API Endpoint: http://localhost:{self.port}/api/
+Webhook URL: http://localhost:{self.port}/api/webhook
+
+Set this in your environment:
+export AGENT_WEBHOOK_URL="http://localhost:{self.port}/api/webhook"
+""")
         
-        return web.json_response(sorted(sessions, key=lambda x: x["start_time"], reverse=True))
+        # Keep running
+        await asyncio.Event().wait()
+    
+    async def handle_index(self, request):
+        """Serve the dashboard HTML."""
+        # The body is pre-encoded at import time; a matching ETag lets
+        # polling clients short-circuit with a 304 instead of a re-send
+        if request.headers.get('If-None-Match') == _INDEX_ETAG:
+            return web.Response(status=304)
+
+        return web.Response(
+            body=_INDEX_BODY,
+            content_type='text/html',
+            headers={
+                'Cache-Control': 'public, max-age=3600',
+                'ETag': _INDEX_ETAG
+            }
+        )
     
+    async def _scan_logs(self):
+        """Build the in-memory session index from existing log files."""
+        if not self.log_dir.exists():
+            return
+
+        log_files = await asyncio.to_thread(
+            lambda: list(self.log_dir.glob("agent_log_*.jsonl"))
+            + list(self.log_dir.glob("agent_log_*.json"))
+        )
+        entries = await asyncio.to_thread(self._parse_log_metadata, log_files)
+        self._session_index.update(entries)
+
+    def _parse_log_metadata(self, log_files):
+        """Parse session metadata from log files (runs in a worker thread)."""
+        entries = {}
+        for log_file in log_files:
+            try:
+                if log_file.suffix == '.jsonl':
+                    # Header line plus first event carry all the metadata
+                    with open(log_file, 'rb') as f:
+                        header = orjson.loads(f.readline())
+                        first_event = {}
+                        line = f.readline()
+                        if line.strip():
+                            first_event = orjson.loads(line)
+                    entries[header["session_id"]] = {
+                        "session_id": header["session_id"],
+                        "start_time": header.get("start_time", "Unknown"),
+                        "task": first_event.get("data", {}).get("task", "Unknown")
+                    }
+                else:
+                    with open(log_file, 'rb') as f:
+                        data = orjson.loads(f.read())
+                    entries[data["session_id"]] = {
+                        "session_id": data["session_id"],
+                        "start_time": data.get("start_time", "Unknown"),
+                        "task": data.get("events", [{}])[0].get("data", {}).get("task", "Unknown")
+                    }
+            except:
+                pass
+        return entries
+
+    async def handle_sessions(self, request):
+        """Return list of all sessions from the in-memory index."""
+        sessions = sorted(
+            self._session_index.values(),
+            key=lambda x: x["start_time"],
+            reverse=True
+        )
+        return _json_response(sessions)
+
     async def handle_session(self, request):
         """Return details of a specific session."""
         session_id = request.match_info['session_id']
+
+        jsonl_file = self.log_dir / f"agent_log_{session_id}.jsonl"
+        if jsonl_file.exists():
+            return _json_response(self._read_jsonl_session(session_id, jsonl_file))
+
         log_file = self.log_dir / f"agent_log_{session_id}.json"
-        
+
         if log_file.exists():
-            with open(log_file, 'r') as f:
-                data = json.load(f)
-            return web.json_response(data)
-        
-        return web.json_response({"error": "Session not found"}, status=404)
+            # Serve the cached serialized body unless the log changed on disk
+            stat = log_file.stat()
+            cache_key = (session_id, stat.st_mtime_ns)
+            body = self._detail_cache.get(cache_key)
+            if body is not None:
+                return web.Response(body=body, content_type='application/json')
+
+            # Memory-map the log so the parser reads straight from the
+            # page cache; mmap of an empty file raises, so guard on size
+            with open(log_file, 'rb') as f:
+                if stat.st_size > 0:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        data = orjson.loads(memoryview(mm))
+                else:
+                    data = {}
+            body = orjson.dumps(data)
+            self._detail_cache[cache_key] = body
+            return web.Response(body=body, content_type='application/json')
+
+        return _json_response({"error": "Session not found"}, status=404)
+
+    def _read_jsonl_session(self, session_id, log_file):
+        """Assemble a session from its NDJSON log, reading only appended lines.
+
+        The byte offset already consumed is tracked per session, so each
+        request seeks past the parsed prefix and decodes just the tail the
+        agent appended since the previous poll.
+        """
+        offset, data = self._offsets.get(session_id, (0, None))
+        size = log_file.stat().st_size
+
+        if data is None or size < offset:
+            # First read, or the file was rotated/truncated: start over
+            offset, data = 0, {"session_id": session_id, "events": []}
+
+        if size > offset:
+            with open(log_file, 'rb') as f:
+                f.seek(offset)
+                tail = f.read()
+
+            # The agent's batched appends can be split across write()
+            # calls, so the tail may end mid-line; consume only up to the
+            # last newline and leave the torn remainder for the next poll
+            consumed = tail.rfind(b'\n') + 1
+
+            # Parse the whole slice before touching the cached session, so
+            # a bad line can't leave half the tail applied and then
+            # re-appended (duplicated) when the next poll retries it
+            records = [
+                orjson.loads(line)
+                for line in tail[:consumed].splitlines()
+                if line.strip()
+            ]
+            if records:
+                if offset == 0:
+                    data.update(records[0])  # header line
+                    records = records[1:]
+                data["events"].extend(records)
+            self._offsets[session_id] = (offset + consumed, data)
+
+        return data
     
     async def handle_current(self, request):
         """Return current active session."""
         if self.current_session:
-            return web.json_response({"session_id": self.current_session})
-        return web.json_response({"session_id": None})
+            return _json_response({"session_id": self.current_session})
+        return _json_response({"session_id": None})
     
+    async def handle_ws(self, request):
+        """Upgrade to a WebSocket and stream webhook events to the client."""
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self._ws_clients.add(ws)
+
+        try:
+            # Clients only listen; drain incoming frames until they close
+            async for _ in ws:
+                pass
+        finally:
+            self._ws_clients.discard(ws)
+
+        return ws
+
     async def handle_webhook(self, request):
         """Handle webhook from agent."""
         try:
-            data = await request.json()
+            body = await request.read()
+
+            # Drop exact replays (retrying agents re-POST identical bodies)
+            digest = hashlib.blake2b(body, digest_size=8).digest()
+            if digest in self._recent_set:
+                return _json_response({"status": "dup"})
+            if len(self._recent_events) == self._recent_events.maxlen:
+                self._recent_set.discard(self._recent_events.popleft())
+            self._recent_events.append(digest)
+            self._recent_set.add(digest)
+
+            data = orjson.loads(body)
             self.current_session = data.get("session_id")
-            
-            # You could also broadcast to WebSocket clients here
-            print(f"📡 Webhook received: {data.get('event', {}).get('type', 'unknown')}")
-            
-            return web.json_response({"status": "ok"})
+
+            # Keep the session index current without re-scanning the log dir
+            event = data.get("event", {})
+            event_type = event.get("type", "unknown")
+            if event_type in ("session_started", "session_completed"):
+                session_id = data.get("session_id")
+                if session_id:
+                    entry = self._session_index.setdefault(session_id, {
+                        "session_id": session_id,
+                        "start_time": event.get("timestamp", "Unknown"),
+                        "task": "Unknown"
+                    })
+                    task = event.get("data", {}).get("task")
+                    if task:
+                        entry["task"] = task
+
+            # Push the event to connected dashboards, evicting dead peers
+            for ws in list(self._ws_clients):
+                try:
+                    await ws.send_json(data)
+                except Exception:
+                    self._ws_clients.discard(ws)
+
+            self._emit(f"📡 Webhook received: {event_type}\n".encode())
+
+            return _json_response({"status": "ok"})
         except Exception as e:
-            return web.json_response({"error": str(e)}, status=400)
+            return _json_response({"error": str(e)}, status=400)
 
 
 if __name__ == "__main__":
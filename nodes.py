@@ -1,32 +1,92 @@
 """Node definitions for Claude Code Subagent."""
 
-import sys
-import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
-
 from pathlib import Path
-import json
-import yaml
-from pocketflow import Node, AsyncNode, BatchNode
-from utils.claude_interface import call_claude_code, call_claude_with_tools, parse_yaml_response
+from collections import deque
+from dataclasses import dataclass
+import asyncio
+import re
+import orjson
+from pocketflow import Node, AsyncNode
+from utils.claude_interface import (
+    call_claude_with_tools,
+    parse_yaml_response,
+    build_cached_prompt
+)
 from utils.code_analyzer import analyze_project, analyze_python_file, extract_todo_comments
+from utils.plan_cache import PlanCache, get_plan_cache, plan_cache_enabled
+from utils.schemas import requirements_response, decision_response
 from utils.task_decomposer import decompose_task, prioritize_steps, validate_plan
 from claude_code_sdk import ClaudeCodeOptions
 
 
-class UnderstandRequirements(AsyncNode):
-    """Parse and understand the user's coding task."""
-    
-    async def prep_async(self, shared):
-        return shared.get("task", "")
-    
-    async def exec_async(self, task):
-        if not task:
-            return {"error": "No task provided"}
-        
-        prompt = f"""DO NOT explore files or use tools. Simply analyze this text and return YAML.
+# Maps a decided action onto its try counter in the shared FSM dict
+_FSM_KEYS = {"plan": "plan_tries", "implement": "impl_tries", "test": "test_tries"}
+
+
+def _get_fsm(shared):
+    """Return the O(1) action state machine, creating it for bare nodes."""
+    return shared.setdefault(
+        "fsm",
+        {"plan_tries": 0, "impl_tries": 0, "test_tries": 0, "last_action": None}
+    )
+
+
+# One DFA pass over the test output instead of a substring scan per indicator
+_ERROR_RE = re.compile(rb"error|failed|exception|traceback|syntaxerror", re.IGNORECASE)
+
+
+def _project_path_obj(shared) -> Path:
+    """Return the project path as a Path, reusing the analyzer's conversion."""
+    context = shared.get("context", {})
+    obj = context.get("project_path_obj")
+    return obj if obj is not None else Path(context.get("project_path", "."))
 
-Task to analyze: {task}
+
+def _speculation_fingerprint(step):
+    """Identity of a plan step for speculation matching.
+
+    Re-planning can hand out an id that an earlier plan already used, so
+    the id alone would let a stale in-flight result be consumed for a
+    different step; the name and description pin the content as well.
+    """
+    return (step.get("id"), step.get("name"), step.get("description"))
+
+
+def _cancel_speculation(shared):
+    """Cancel any in-flight speculative implement step, counting a miss.
+
+    Every node the decision loop can route to instead of ImplementCode
+    must call this on entry: a leftover speculative task runs with
+    bypassPermissions and would keep mutating project files underneath
+    the test or refactor pass.
+    """
+    speculation = shared.pop("_speculative_task", None)
+    if speculation is not None:
+        speculation[1].cancel()
+        stats = shared.setdefault("speculation_stats", {"hits": 0, "misses": 0})
+        stats["misses"] += 1
+
+
+@dataclass(slots=True)
+class IterationBudget:
+    """Countdown guard for the decision loop.
+
+    A slotted int decrement is cheaper than rehashing a shared-store key
+    every iteration, and keeps the limit check to a single comparison.
+    """
+    remaining: int
+    total: int
+
+    @property
+    def used(self) -> int:
+        return self.total - self.remaining
+
+
+# Static prompt scaffolding. These blocks are byte-identical across calls and
+# placed at the start of every prompt so the SDK's prompt-prefix cache hits;
+# per-iteration data is always appended after them.
+
+UNDERSTAND_STATIC_PROMPT = """DO NOT explore files or use tools. Simply analyze the task text in the context below and return YAML.
 
 Return ONLY the following YAML structure with no other text:
 ```yaml
@@ -42,13 +102,121 @@ requirements:
   deliverables:
     - "Expected outputs"
 ```"""
-        
-        options = ClaudeCodeOptions(
-            system_prompt="You are an expert software architect analyzing requirements.",
-            max_turns=1
+
+DECIDE_STATIC_PROMPT = """DO NOT explore files or use tools. Just decide on the next action based on the context below.
+
+Available Actions:
+- plan: Create or update implementation plan
+- implement: Write or modify code
+- test: Test the implementation
+- refactor: Improve existing code
+- complete: Task is finished
+
+Return ONLY this YAML structure:
+```yaml
+action: <action_name>
+reasoning: "Why this action"
+confidence: <0.0-1.0>
+```"""
+
+IMPLEMENT_STATIC_PROMPT = """Implement the step described in the context below.
+
+Please implement this step by creating or modifying the necessary files.
+Use the appropriate tools (Read, Write, Bash) to complete the implementation.
+Ensure the code is well-structured, follows best practices, and includes appropriate comments."""
+
+TEST_STATIC_PROMPT = """Test the implementation described in the context below to ensure it works correctly.
+
+Please:
+1. Check if the files are syntactically correct
+2. Run any available tests
+3. Try to execute the main entry points
+4. Report any errors or issues found
+
+Use the Bash tool to run commands and Read tool to check files as needed."""
+
+REFACTOR_STATIC_PROMPT = """Refactor and improve the code implementation described in the context below.
+
+Please:
+1. Fix any errors or issues identified
+2. Improve code quality and structure
+3. Add better error handling
+4. Ensure code follows best practices
+5. Add or improve documentation/comments
+
+Use Read to examine files, Write to modify them, and Bash to test changes."""
+
+
+# Dynamic context tails, pre-baked with format_map slots so each call fills
+# values into an already-built literal instead of reassembling an f-string
+
+_UNDERSTAND_CONTEXT_TMPL = "Task to analyze: {task}"
+
+_DECIDE_CONTEXT_TMPL = """Current State: {state}
+Task: {task}
+Completed Steps: {steps}
+Errors: {errors}
+
+Consider:
+1. Has a plan been created? {has_plan}
+2. Has implementation started? {has_impl}
+3. Are there errors to fix? {has_errors}"""
+
+_IMPLEMENT_CONTEXT_TMPL = """Step: {name}
+Description: {description}
+Type: {type}
+
+Project Path: {project_path}
+Previous files created: {previous_files}
+
+Requirements context:
+{requirements_json}"""
+
+_TEST_CONTEXT_TMPL = """Files created: {files_created}
+Project path: {project_path}
+
+Suggested test commands:
+{test_commands}"""
+
+_REFACTOR_CONTEXT_TMPL = """Files to refactor: {files_created}
+Issues found: {issues}
+Test output: {test_output}"""
+
+
+class UnderstandRequirements(AsyncNode):
+    """Parse and understand the user's coding task."""
+
+    # Immutable for the node's lifetime; built once instead of per call
+    _OPTIONS = ClaudeCodeOptions(
+        system_prompt="You are an expert software architect analyzing requirements.",
+        max_turns=1
+    )
+
+    async def prep_async(self, shared):
+        return shared.get("task", "")
+    
+    async def exec_async(self, task):
+        if not task:
+            return {"error": "No task provided"}
+
+        # Identical task text yields identical requirements across runs
+        cache_key = None
+        if plan_cache_enabled():
+            cache_key = PlanCache.make_key("understand", task=task)
+            cached = get_plan_cache().get(cache_key)
+            if cached is not None:
+                print("✓ Requirements served from plan cache")
+                return cached
+
+        prompt = build_cached_prompt(
+            UNDERSTAND_STATIC_PROMPT,
+            _UNDERSTAND_CONTEXT_TMPL.format_map({"task": task})
         )
-        
-        return await parse_yaml_response(prompt, options)
+
+        result = await parse_yaml_response(prompt, self._OPTIONS, schema=requirements_response)
+        if cache_key is not None and isinstance(result, dict) and "error" not in result:
+            get_plan_cache().set(cache_key, result)
+        return result
     
     async def post_async(self, shared, prep_res, exec_res):
         if isinstance(exec_res, dict) and "requirements" in exec_res:
@@ -68,7 +236,7 @@ requirements:
             shared["state"] = "requirements_understood"
             print(f"✓ Using simplified requirements for: {prep_res}")
         else:
-            shared["errors"] = shared.get("errors", []) + ["Failed to understand requirements"]
+            shared.setdefault("errors", []).append("Failed to understand requirements")
             print(f"✗ Failed to parse requirements: {type(exec_res)}")
         
         return "default"
@@ -92,6 +260,8 @@ class AnalyzeContext(Node):
     
     def post(self, shared, prep_res, exec_res):
         shared["context"].update(exec_res)
+        # Convert once; the implement/test/refactor loop reuses this Path
+        shared["context"]["project_path_obj"] = Path(prep_res)
         shared["state"] = "context_analyzed"
         
         if "error" not in exec_res:
@@ -104,9 +274,71 @@ class AnalyzeContext(Node):
         return "default"
 
 
+class UnderstandAndAnalyze(AsyncNode):
+    """Run requirement understanding and context analysis concurrently.
+
+    The two preamble nodes share no data dependency — one is an LLM
+    round-trip, the other filesystem I/O — and their outputs merge only
+    at planning, so overlapping them costs max(t_llm, t_scan) instead of
+    the sum. They write disjoint shared keys (requirements vs context).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._understand = UnderstandRequirements()
+        self._analyze = AnalyzeContext()
+
+    async def prep_async(self, shared):
+        return shared
+
+    async def exec_async(self, shared):
+        # AnalyzeContext is synchronous; push it onto a thread so the
+        # directory scan runs while the LLM call is in flight
+        await asyncio.gather(
+            self._understand.run_async(shared),
+            asyncio.to_thread(self._analyze.run, shared)
+        )
+        return None
+
+    async def post_async(self, shared, prep_res, exec_res):
+        # Both inner nodes raced on shared["state"]; settle on the value
+        # the serial ordering would have left
+        shared["state"] = "context_analyzed"
+        return "default"
+
+
 class DecideAction(AsyncNode):
     """Determine next action based on current state."""
-    
+
+    # Immutable for the node's lifetime; built once instead of per call
+    _OPTIONS = ClaudeCodeOptions(
+        system_prompt="You are an intelligent agent deciding on the next best action.",
+        max_turns=1
+    )
+
+    # Bound on memoized (fingerprint -> decision) entries
+    max_cached_decisions = 32
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # In-process memo of recent decisions; the orchestrator shallow-
+        # copies nodes per step, so every copy shares this dict
+        self._decision_cache = {}
+
+    @staticmethod
+    def _fingerprint(context):
+        """Reduce the decision context to the state that drives the action."""
+        # The task is part of the key: the wired graph (and this dict) is
+        # reused across runs, so task B must not replay task A's decisions
+        return (
+            context["task"],
+            context["state"],
+            bool(context["plan"]),
+            bool(context["implementation"]),
+            bool(context["errors"]),
+            min(len(context["history"]), 20)
+        )
+
     async def prep_async(self, shared):
         return {
             "state": shared.get("state", "initial"),
@@ -115,50 +347,69 @@ class DecideAction(AsyncNode):
             "plan": shared.get("plan", {}),
             "implementation": shared.get("implementation", {}),
             "history": shared.get("history", []),
-            "errors": shared.get("errors", [])
+            "errors": shared.get("errors", []),
+            "fsm": _get_fsm(shared)
         }
     
     async def exec_async(self, context):
-        # Build decision prompt
-        prompt = f"""DO NOT explore files or use tools. Just decide on the next action.
-
-Current State: {context['state']}
-Task: {context['task']}
-Completed Steps: {len(context['history'])}
-Errors: {len(context.get('errors', []))}
-
-Available Actions:
-- plan: Create or update implementation plan
-- implement: Write or modify code
-- test: Test the implementation
-- refactor: Improve existing code
-- complete: Task is finished
-
-Consider:
-1. Has a plan been created? {bool(context['plan'])}
-2. Has implementation started? {bool(context['implementation'])}
-3. Are there errors to fix? {bool(context['errors'])}
-
-Return ONLY this YAML structure:
-```yaml
-action: <action_name>
-reasoning: "Why this action"
-confidence: <0.0-1.0>
-```"""
-        
-        options = ClaudeCodeOptions(
-            system_prompt="You are an intelligent agent deciding on the next best action.",
-            max_turns=1
+        # Re-visiting an unchanged decision point skips the LLM round-trip
+        fingerprint = self._fingerprint(context)
+        memoized = self._decision_cache.get(fingerprint)
+        if memoized is not None:
+            return memoized
+
+        # Fingerprint only the state that drives the decision — not the
+        # full history — so near-identical decision points hit across
+        # runs. The task is part of the key here too: entries left behind
+        # by an interrupted run must not be replayed for a different task.
+        cache_key = None
+        if plan_cache_enabled():
+            cache_key = PlanCache.make_key(
+                "decide",
+                task=context["task"],
+                state=context["state"],
+                has_plan=bool(context["plan"]),
+                has_impl=bool(context["implementation"]),
+                has_errors=bool(context["errors"]),
+                plan_count=context["fsm"]["plan_tries"]
+            )
+            cached = get_plan_cache().get(cache_key)
+            if cached is not None:
+                return cached
+
+        # Build decision prompt: static instructions first, dynamic state last
+        prompt = build_cached_prompt(
+            DECIDE_STATIC_PROMPT,
+            _DECIDE_CONTEXT_TMPL.format_map({
+                "state": context['state'],
+                "task": context['task'],
+                "steps": len(context['history']),
+                "errors": len(context.get('errors', [])),
+                "has_plan": bool(context['plan']),
+                "has_impl": bool(context['implementation']),
+                "has_errors": bool(context['errors'])
+            })
         )
         
-        result = await parse_yaml_response(prompt, options)
+        result = await parse_yaml_response(prompt, self._OPTIONS, schema=decision_response)
+        if isinstance(result, dict) and "action" in result:
+            if len(self._decision_cache) >= self.max_cached_decisions:
+                self._decision_cache.pop(next(iter(self._decision_cache)))
+            self._decision_cache[fingerprint] = result
+            if cache_key is not None:
+                get_plan_cache().set(cache_key, result)
         return result
-    
+
     async def post_async(self, shared, prep_res, exec_res):
-        # Increment iteration counter
-        shared["current_iteration"] = shared.get("current_iteration", 0) + 1
-        
-        print(f"\n🤔 DECISION POINT (Iteration {shared['current_iteration']}):")
+        # Spend one unit of the iteration budget (flows without a prep
+        # phase get a default budget on first decision)
+        budget = shared.get("budget")
+        if budget is None:
+            total = shared.get("max_iterations", 10)
+            budget = shared["budget"] = IterationBudget(remaining=total, total=total)
+        budget.remaining -= 1
+
+        print(f"\n🤔 DECISION POINT (Iteration {budget.used}):")
         print("="*60)
         print(f"Current State: {prep_res.get('state', 'unknown')}")
         print(f"Has Plan: {bool(prep_res.get('plan'))}")
@@ -166,18 +417,30 @@ confidence: <0.0-1.0>
         print(f"Errors Present: {bool(prep_res.get('errors'))}")
         print(f"History Length: {len(prep_res.get('history', []))}")
         
-        # Check if we've hit the iteration limit
-        max_iterations = shared.get("max_iterations", 10)
-        if shared["current_iteration"] >= max_iterations:
-            print(f"⚠️ Reached maximum iterations ({max_iterations}), completing...")
+        # Check if we've exhausted the iteration budget
+        if budget.remaining <= 0:
+            print(f"⚠️ Reached maximum iterations ({budget.total}), completing...")
             return "complete"
         
+        # Memoized decisions go stale when the plan or implementation state
+        # transitions between visits. The previous signature lives in the
+        # shared store: the orchestrator runs a fresh shallow copy of this
+        # node each step, so an instance attribute would be written to the
+        # discarded copy and never seen again.
+        signature = (bool(prep_res.get("plan")), bool(prep_res.get("implementation")))
+        last_signature = shared.get("_decide_signature")
+        if last_signature is not None and signature != last_signature:
+            self._decision_cache.clear()
+        shared["_decide_signature"] = signature
+
+        fsm = _get_fsm(shared)
+
         # Handle parsing errors with fallback logic
         if not isinstance(exec_res, dict):
             # Determine fallback action based on state
             state = prep_res.get("state", "initial")
-            plan_count = len([h for h in prep_res.get("history", []) if h.get("action") == "plan"])
-            
+            plan_count = fsm["plan_tries"]
+
             if plan_count >= 3:
                 # If we've tried planning 3 times, move to implementation
                 exec_res = {"action": "implement", "reasoning": "Moving to implementation after multiple planning attempts"}
@@ -192,18 +455,25 @@ confidence: <0.0-1.0>
         reasoning = exec_res.get("reasoning", "Continuing development")
         
         # Prevent getting stuck in planning
-        if action == "plan":
-            plan_count = len([h for h in shared.get("history", []) if h.get("action") == "plan"])
-            if plan_count >= 3:
-                action = "implement"
-                reasoning = "Moving to implementation after multiple planning attempts"
-        
-        # Add to history
-        shared["history"] = shared.get("history", []) + [{
+        if action == "plan" and fsm["plan_tries"] >= 3:
+            action = "implement"
+            reasoning = "Moving to implementation after multiple planning attempts"
+
+        # Add to history (a bounded deque in flows that ran prep; appending
+        # to a plain list from bare nodes works the same way)
+        history = shared.get("history")
+        if history is None:
+            history = shared["history"] = deque(maxlen=shared.get("max_iterations", 10) * 2)
+        history.append({
             "action": action,
             "reasoning": reasoning,
             "state": shared.get("state", "unknown")
-        }]
+        })
+        # The single transition point: O(1) counter bump, no history scan
+        key = _FSM_KEYS.get(action)
+        if key is not None:
+            fsm[key] += 1
+        fsm["last_action"] = action
         
         print(f"\n📍 DECISION MADE:")
         print(f"   Action: {action.upper()}")
@@ -218,6 +488,8 @@ class CreatePlan(AsyncNode):
     """Generate implementation plan."""
     
     async def prep_async(self, shared):
+        # Re-planning replaces the plan the speculative step belongs to
+        _cancel_speculation(shared)
         return {
             "task": shared.get("task", ""),
             "requirements": shared.get("requirements", {}),
@@ -227,15 +499,35 @@ class CreatePlan(AsyncNode):
     async def exec_async(self, inputs):
         task = inputs["task"]
         context = inputs["context"]
-        
-        steps = await decompose_task(task, context)
-        
-        # Ensure steps is always a list
-        if not isinstance(steps, list):
-            steps = []
-        
+
+        # Same task and constraints decompose the same way; validation is
+        # local and cheap, so only the steps are cached
+        cache_key = None
+        steps = None
+        if plan_cache_enabled():
+            cache_key = PlanCache.make_key(
+                "plan",
+                task=task,
+                constraints=context.get("constraints", []),
+                project_path=context.get("project_path", ".")
+            )
+            cached = get_plan_cache().get(cache_key)
+            if cached is not None:
+                print("✓ Plan served from plan cache")
+                steps = cached["steps"]
+
+        if steps is None:
+            steps = await decompose_task(task, context)
+
+            # Ensure steps is always a list
+            if not isinstance(steps, list):
+                steps = []
+
+            if cache_key is not None and steps:
+                get_plan_cache().set(cache_key, {"steps": steps})
+
         validation = validate_plan(steps)
-        
+
         return {
             "steps": steps,
             "validation": validation
@@ -250,7 +542,13 @@ class CreatePlan(AsyncNode):
         
         shared["plan"] = plan
         shared["state"] = "planned"
-        
+
+        # Requirements don't change between steps of this plan; serialize
+        # once here instead of per implementation step
+        shared["requirements_json"] = orjson.dumps(
+            shared.get("requirements", {}), option=orjson.OPT_INDENT_2
+        ).decode()
+
         print(f"\n✓ Created plan with {len(plan['steps'])} steps")
         print("\n📋 DETAILED PLAN:")
         print("="*60)
@@ -271,122 +569,220 @@ class CreatePlan(AsyncNode):
 
 class ImplementCode(AsyncNode):
     """Generate or modify code files."""
-    
+
+    # Bound on concurrent Claude sessions per batch (API rate limits)
+    max_parallel_steps = 4
+
+    @staticmethod
+    def _ready_frontier(plan):
+        """Return the run of upcoming steps whose dependencies are done.
+
+        Steps before current_step are complete; the frontier is the
+        consecutive block after it with every dependency satisfied, so
+        its members can execute together.
+        """
+        current_step = plan.get("current_step", 0)
+        steps = plan.get("steps", [])
+        completed_ids = {s.get("id") for s in steps[:current_step]}
+        frontier = []
+        for step in steps[current_step:]:
+            if all(dep in completed_ids for dep in step.get("dependencies", [])):
+                frontier.append(step)
+            else:
+                break
+        return frontier
+
     async def prep_async(self, shared):
         plan = shared.get("plan", {})
         current_step = plan.get("current_step", 0)
         steps = plan.get("steps", [])
-        
-        if current_step < len(steps):
-            step = steps[current_step]
-        else:
-            step = None
-        
+
+        # Tool calls are network-bound, so an N-wide frontier costs
+        # max(step latency) instead of the sum
+        frontier = self._ready_frontier(plan)
+
+        # Check whether the speculation launched after the previous batch
+        # predicted the right step; a mispredict is cancelled and redone
+        stats = shared.setdefault("speculation_stats", {"hits": 0, "misses": 0})
+        speculative_task = None
+        speculation = shared.pop("_speculative_task", None)
+        if speculation is not None:
+            spec_fingerprint, task = speculation
+            if frontier and _speculation_fingerprint(frontier[0]) == spec_fingerprint:
+                stats["hits"] += 1
+                speculative_task = task
+            else:
+                stats["misses"] += 1
+                task.cancel()
+
         return {
-            "step": step,
+            "steps": frontier,
+            "speculative_task": speculative_task,
             "current_step_num": current_step + 1,
             "total_steps": len(steps),
-            "project_path": shared.get("context", {}).get("project_path", "."),
-            "requirements": shared.get("requirements", {}),
+            "project_path": _project_path_obj(shared),
+            "requirements_json": shared.get("requirements_json", ""),
             "previous_files": shared.get("implementation", {}).get("files_created", [])
         }
-    
-    async def exec_async(self, inputs):
-        if not inputs["step"]:
-            return {"error": "No step to implement"}
-        
-        step = inputs["step"]
-        project_path = Path(inputs["project_path"])
-        
-        # Show what we're about to implement
-        print(f"\n🔨 IMPLEMENTING STEP {inputs.get('current_step_num', 'N/A')}/{inputs.get('total_steps', '?')}:")
-        print("="*60)
-        print(f"   Name: {step.get('name', 'Unknown')}")
-        print(f"   Description: {step.get('description', 'N/A')}")
-        print(f"   Type: {step.get('type', 'N/A')}")
-        print(f"   Tools: {', '.join(step.get('tools_needed', ['Read', 'Write']))}")
-        print(f"   Timeout: 5 minutes")
-        print("="*60)
-        print("   Starting implementation...\n")
-        
-        prompt = f"""Implement the following step in the coding task:
 
-Step: {step['name']}
-Description: {step['description']}
-Type: {step['type']}
+    async def _implement_step(self, step, step_num, inputs, semaphore):
+        """Run one plan step through Claude, bounded by the semaphore."""
+        project_path = inputs["project_path"]
 
-Project Path: {project_path}
-Previous files created: {inputs['previous_files']}
+        async with semaphore:
+            # Show what we're about to implement
+            print(f"\n🔨 IMPLEMENTING STEP {step_num}/{inputs.get('total_steps', '?')}:")
+            print("="*60)
+            print(f"   Name: {step.get('name', 'Unknown')}")
+            print(f"   Description: {step.get('description', 'N/A')}")
+            print(f"   Type: {step.get('type', 'N/A')}")
+            print(f"   Tools: {', '.join(step.get('tools_needed', ['Read', 'Write']))}")
+            print(f"   Timeout: 5 minutes")
+            print("="*60)
+            print("   Starting implementation...\n")
+
+            prompt = build_cached_prompt(
+                IMPLEMENT_STATIC_PROMPT,
+                _IMPLEMENT_CONTEXT_TMPL.format_map({
+                    "name": step['name'],
+                    "description": step['description'],
+                    "type": step['type'],
+                    "project_path": project_path,
+                    "previous_files": inputs['previous_files'],
+                    "requirements_json": inputs['requirements_json']
+                })
+            )
 
-Requirements context:
-{json.dumps(inputs['requirements'], indent=2)}
+            # Determine which tools are needed
+            tools_needed = step.get("tools_needed", ["Read", "Write"])
+            if "Bash" not in tools_needed and step['type'] == 'test':
+                tools_needed.append("Bash")
+
+            try:
+                # Add timeout for tool operations
+                result = await asyncio.wait_for(
+                    call_claude_with_tools(
+                        prompt,
+                        allowed_tools=tools_needed,
+                        working_dir=project_path,
+                        permission_mode='bypassPermissions'
+                    ),
+                    timeout=300.0  # 5 minute timeout
+                )
+            except asyncio.TimeoutError:
+                print("⚠️ Implementation step timed out after 5 minutes")
+                result = {"error": "Timeout during implementation", "text": "Operation timed out"}
 
-Please implement this step by creating or modifying the necessary files.
-Use the appropriate tools (Read, Write, Bash) to complete the implementation.
-Ensure the code is well-structured, follows best practices, and includes appropriate comments."""
-        
-        # Determine which tools are needed
-        tools_needed = step.get("tools_needed", ["Read", "Write"])
-        if "Bash" not in tools_needed and step['type'] == 'test':
-            tools_needed.append("Bash")
-        
-        try:
-            # Add timeout for tool operations
-            import asyncio
-            result = await asyncio.wait_for(
-                call_claude_with_tools(
-                    prompt,
-                    allowed_tools=tools_needed,
-                    working_dir=project_path,
-                    permission_mode='bypassPermissions'
-                ),
-                timeout=300.0  # 5 minute timeout
-            )
-        except asyncio.TimeoutError:
-            print("⚠️ Implementation step timed out after 5 minutes")
-            result = {"error": "Timeout during implementation", "text": "Operation timed out"}
-        
         return result
-    
+
+    async def exec_async(self, inputs):
+        steps = inputs["steps"]
+        if not steps:
+            return {"error": "No step to implement"}
+
+        # Dispatch the whole ready frontier concurrently; each step is an
+        # independent Claude session. A correctly-predicted speculation is
+        # already in flight for the first step — await it instead of
+        # paying its latency again.
+        semaphore = asyncio.Semaphore(self.max_parallel_steps)
+        first = inputs["current_step_num"]
+        calls = [
+            self._implement_step(step, first + offset, inputs, semaphore)
+            for offset, step in enumerate(steps)
+        ]
+        if inputs.get("speculative_task") is not None:
+            calls[0].close()
+            calls[0] = inputs["speculative_task"]
+        results = await asyncio.gather(*calls)
+
+        return {"results": results, "batch_size": len(steps)}
+
     async def post_async(self, shared, prep_res, exec_res):
         if "error" in exec_res:
-            shared["errors"] = shared.get("errors", []) + [exec_res["error"]]
+            shared.setdefault("errors", []).append(exec_res["error"])
             return "error"
-        
+
+        results = exec_res["results"]
+
         # Track implementation changes
         impl = shared.get("implementation", {
             "files_created": [],
             "files_modified": [],
             "tool_uses": []
         })
-        
-        # Parse tool uses to track file changes
-        for tool_use in exec_res.get("tool_uses", []):
-            impl["tool_uses"].append(tool_use)
-            
-            if tool_use["name"] == "Write":
-                file_path = tool_use["input"].get("file_path", "")
-                if file_path and file_path not in impl["files_created"]:
-                    impl["files_created"].append(file_path)
-        
+
+        # O(1) dedup membership; the list keeps ordered display. The
+        # underscore key never reaches the summary — FinalizeProject copies
+        # named fields only.
+        seen_files = impl.setdefault("_files_created_set", set(impl["files_created"]))
+
+        # Merge tool uses from every step in the batch to track file changes
+        errors = []
+        total_cost = 0.0
+        completed_streak = 0
+        for index, result in enumerate(results):
+            if "error" in result:
+                errors.append(result["error"])
+                continue
+
+            # Length of the leading run of successes; the cursor only
+            # advances past these so failed steps stay pending
+            if completed_streak == index:
+                completed_streak += 1
+
+            total_cost += result.get("cost", 0)
+            for tool_use in result.get("tool_uses", []):
+                impl["tool_uses"].append(tool_use)
+
+                if tool_use.name == "Write":
+                    file_path = tool_use.input.get("file_path", "")
+                    if file_path and file_path not in seen_files:
+                        seen_files.add(file_path)
+                        impl["files_created"].append(file_path)
+
         shared["implementation"] = impl
-        
-        # Update plan progress
+
+        if errors:
+            shared.setdefault("errors", []).extend(errors)
+            if len(errors) == len(results):
+                return "error"
+
+        # Advance only past the steps that actually completed; a failed
+        # step (and everything after it) is retried on the next visit
+        # instead of being permanently marked done
         plan = shared.get("plan", {})
-        plan["current_step"] = plan.get("current_step", 0) + 1
+        plan["current_step"] = plan.get("current_step", 0) + completed_streak
         shared["plan"] = plan
-        
+
         shared["state"] = "implementing"
-        
+
+        # Speculatively start the next ready step while the flow cycles
+        # through the decision point; if it routes straight back here (the
+        # common case), the call is already in flight on arrival
+        if not errors:
+            next_frontier = self._ready_frontier(plan)
+            if next_frontier:
+                next_step = next_frontier[0]
+                spec_inputs = {
+                    "project_path": _project_path_obj(shared),
+                    "requirements_json": shared.get("requirements_json", ""),
+                    "previous_files": list(impl["files_created"]),
+                    "total_steps": len(plan.get("steps", []))
+                }
+                task = asyncio.create_task(self._implement_step(
+                    next_step, plan["current_step"] + 1, spec_inputs, asyncio.Semaphore(1)
+                ))
+                shared["_speculative_task"] = (_speculation_fingerprint(next_step), task)
+
         print(f"\n✅ STEP COMPLETED: {plan['current_step']}/{len(plan.get('steps', []))}")
         if impl["files_created"]:
             print(f"   Files created so far: {len(impl['files_created'])}")
             for file in impl["files_created"][-3:]:  # Show last 3 files
                 print(f"     - {file}")
-        if exec_res.get("cost", 0) > 0:
-            print(f"   Cost: ${exec_res['cost']:.4f}")
+        if total_cost > 0:
+            print(f"   Cost: ${total_cost:.4f}")
         print()
-        
+
         return "default"
 
 
@@ -394,14 +790,16 @@ class TestImplementation(AsyncNode):
     """Test the generated code."""
     
     async def prep_async(self, shared):
+        # The decision point routed here instead of back to implement
+        _cancel_speculation(shared)
         return {
-            "project_path": shared.get("context", {}).get("project_path", "."),
+            "project_path": _project_path_obj(shared),
             "files_created": shared.get("implementation", {}).get("files_created", []),
             "entry_points": shared.get("context", {}).get("entry_points", [])
         }
     
     async def exec_async(self, inputs):
-        project_path = Path(inputs["project_path"])
+        project_path = inputs["project_path"]
         
         # Build test prompt
         test_commands = []
@@ -418,21 +816,14 @@ class TestImplementation(AsyncNode):
             test_commands.append("npm test")
             test_commands.append(f"node {js_files[0]}")
         
-        prompt = f"""Test the implementation to ensure it works correctly.
-
-Files created: {inputs['files_created']}
-Project path: {project_path}
-
-Suggested test commands:
-{chr(10).join(f'- {cmd}' for cmd in test_commands)}
-
-Please:
-1. Check if the files are syntactically correct
-2. Run any available tests
-3. Try to execute the main entry points
-4. Report any errors or issues found
-
-Use the Bash tool to run commands and Read tool to check files as needed."""
+        prompt = build_cached_prompt(
+            TEST_STATIC_PROMPT,
+            _TEST_CONTEXT_TMPL.format_map({
+                "files_created": inputs['files_created'],
+                "project_path": project_path,
+                "test_commands": "\n".join(f'- {cmd}' for cmd in test_commands)
+            })
+        )
         
         try:
             import asyncio
@@ -458,14 +849,10 @@ Use the Bash tool to run commands and Read tool to check files as needed."""
             "output": exec_res.get("text", "")
         }
         
-        # Check for error indicators in the output
-        error_indicators = ["error", "failed", "exception", "traceback", "syntaxerror"]
-        output_lower = test_results["output"].lower()
-        
-        for indicator in error_indicators:
-            if indicator in output_lower:
-                test_results["success"] = False
-                break
+        # Check for error indicators in a single pass, without the full
+        # lowercased copy of the output
+        if _ERROR_RE.search(test_results["output"].encode("utf-8", "replace")):
+            test_results["success"] = False
         
         shared["test_results"] = test_results
         shared["state"] = "tested"
@@ -474,7 +861,7 @@ Use the Bash tool to run commands and Read tool to check files as needed."""
             print("✓ Tests passed successfully")
         else:
             print("✗ Tests failed - may need refactoring")
-            shared["errors"] = shared.get("errors", []) + ["Test failures detected"]
+            shared.setdefault("errors", []).append("Test failures detected")
         
         return "default"
 
@@ -483,35 +870,31 @@ class RefactorCode(AsyncNode):
     """Improve code based on test results or requirements."""
     
     async def prep_async(self, shared):
+        # The decision point routed here instead of back to implement
+        _cancel_speculation(shared)
         return {
-            "project_path": shared.get("context", {}).get("project_path", "."),
+            "project_path": _project_path_obj(shared),
             "test_results": shared.get("test_results", {}),
             "errors": shared.get("errors", []),
             "files_created": shared.get("implementation", {}).get("files_created", [])
         }
     
     async def exec_async(self, inputs):
-        project_path = Path(inputs["project_path"])
+        project_path = inputs["project_path"]
         
         issues = []
         if not inputs["test_results"].get("success", True):
             issues.append("Test failures detected")
         issues.extend(inputs.get("errors", []))
         
-        prompt = f"""Refactor and improve the code implementation.
-
-Files to refactor: {inputs['files_created']}
-Issues found: {issues}
-Test output: {inputs['test_results'].get('output', 'No test output')}
-
-Please:
-1. Fix any errors or issues identified
-2. Improve code quality and structure
-3. Add better error handling
-4. Ensure code follows best practices
-5. Add or improve documentation/comments
-
-Use Read to examine files, Write to modify them, and Bash to test changes."""
+        prompt = build_cached_prompt(
+            REFACTOR_STATIC_PROMPT,
+            _REFACTOR_CONTEXT_TMPL.format_map({
+                "files_created": inputs['files_created'],
+                "issues": issues,
+                "test_output": inputs['test_results'].get('output', 'No test output')
+            })
+        )
         
         try:
             import asyncio
@@ -566,7 +949,23 @@ class FinalizeProject(Node):
     def post(self, shared, prep_res, exec_res):
         shared["summary"] = exec_res
         shared["state"] = "completed"
-        
+
+        # Discard any in-flight speculation left by the implement loop
+        speculation = shared.pop("_speculative_task", None)
+        if speculation is not None:
+            speculation[1].cancel()
+
+        stats = shared.get("speculation_stats")
+        if stats and (stats["hits"] or stats["misses"]):
+            total = stats["hits"] + stats["misses"]
+            print(f"Speculation hit rate: {stats['hits']}/{total}")
+
+        # Decision fingerprints carry per-run counters that won't line up
+        # with a fresh run; the task-keyed understand/plan entries stay —
+        # reuse across runs is the point of the persistent cache
+        if plan_cache_enabled():
+            get_plan_cache().invalidate("decide")
+
         print("\n" + "="*50)
         print("✓ Task Completed Successfully!")
         print("="*50)
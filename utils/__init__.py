@@ -1,6 +1,7 @@
 """Utility modules for Claude Code Subagent."""
 
 from .claude_interface import (
+    ToolUse,
     call_claude_code,
     call_claude_with_tools,
     parse_yaml_response
@@ -13,6 +14,19 @@ from .code_analyzer import (
     extract_todo_comments
 )
 
+from .llm_cache import (
+    LLMCache,
+    MemoryCacheBackend,
+    RedisCacheBackend,
+    get_default_cache
+)
+
+from .plan_cache import (
+    PlanCache,
+    get_plan_cache,
+    plan_cache_enabled
+)
+
 from .task_decomposer import (
     decompose_task,
     prioritize_steps,
@@ -21,6 +35,7 @@ from .task_decomposer import (
 )
 
 __all__ = [
+    'ToolUse',
     'call_claude_code',
     'call_claude_with_tools',
     'parse_yaml_response',
@@ -28,6 +43,13 @@ __all__ = [
     'analyze_python_file',
     'find_similar_files',
     'extract_todo_comments',
+    'LLMCache',
+    'MemoryCacheBackend',
+    'RedisCacheBackend',
+    'get_default_cache',
+    'PlanCache',
+    'get_plan_cache',
+    'plan_cache_enabled',
     'decompose_task',
     'prioritize_steps',
     'estimate_complexity',
@@ -0,0 +1,75 @@
+"""Persistent on-disk cache of Python file analysis keyed by content hash."""
+
+import os
+import sys
+import mmap
+import pickle
+import hashlib
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+_CACHE_DIR = Path("./.pocketclaude_cache/ast")
+
+# ast.parse output is interpreter-specific; bake the version into the
+# entry name so an upgrade invalidates naturally instead of mis-hitting
+_VERSION_TAG = f"py{sys.version_info.major}{sys.version_info.minor}"
+
+
+def _entry_path(digest: str) -> Path:
+    """Shard entries by the first hex byte to keep directories small."""
+    return _CACHE_DIR / digest[:2] / f"{digest}-{_VERSION_TAG}.pkl"
+
+
+def get_or_parse(
+    file_path: str,
+    compute: Callable[[bytes], Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Return the cached analysis for a file, computing and storing on miss.
+
+    The key is SHA-256 of the file bytes, so results survive renames and
+    moves and invalidate exactly when content changes — no mtime races.
+    Warm hits cost one hash over an mmapped view plus a pickle load,
+    which is orders of magnitude cheaper than re-running ast.parse.
+
+    Args:
+        file_path: Path to the Python file
+        compute: Callback mapping the file's bytes to an analysis dict;
+            only successful results (no exception) are cached
+
+    Returns:
+        The analysis dictionary for the file's current content
+    """
+    with open(file_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                digest = hashlib.sha256(mm).hexdigest()
+                content = bytes(mm)
+        else:
+            digest = hashlib.sha256(b"").hexdigest()
+            content = b""
+
+    entry = _entry_path(digest)
+    if entry.exists():
+        try:
+            with open(entry, 'rb') as cached:
+                return pickle.load(cached)
+        except Exception:
+            # Corrupt or truncated entry: fall through and rewrite it
+            pass
+
+    result = compute(content)
+
+    entry.parent.mkdir(parents=True, exist_ok=True)
+    # Write-then-rename so pool workers racing on the same file never
+    # observe a half-written pickle
+    tmp = entry.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        with open(tmp, 'wb') as out:
+            pickle.dump(result, out, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, entry)
+    except OSError:
+        tmp.unlink(missing_ok=True)
+
+    return result
@@ -1,11 +1,34 @@
 """Claude Code SDK interface utilities."""
 
 import os
-from typing import Optional, AsyncIterator, List, Dict, Any
+from typing import Optional, AsyncIterator, List, Dict, Any, NamedTuple
 from pathlib import Path
+import io
+import re
 import json
 import yaml
 
+try:
+    # libyaml C extension, ~10x faster than the pure-Python loader
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
+# Extracts a fenced YAML block (``` / ```yaml / ```yml) in a single pass
+_YAML_BLOCK_RE = re.compile(r"```(?:yaml|yml)?\s*\n(.*?)\n```", re.DOTALL)
+
+
+class ToolUse(NamedTuple):
+    """One tool invocation from a response stream.
+
+    A tuple is a fraction of the size of the dict-per-block it replaces
+    and gives attribute access instead of key hashing; use _asdict() when
+    an entry needs to be serialized.
+    """
+    id: str
+    name: str
+    input: Dict[str, Any]
+
 from claude_code_sdk import (
     query,
     ClaudeCodeOptions,
@@ -16,45 +39,86 @@ from claude_code_sdk import (
     ResultMessage,
 )
 
+from utils.llm_cache import LLMCache, get_default_cache, cache_enabled
+from utils.schemas import SchemaError
+
+
+def build_cached_prompt(static_prompt: str, dynamic_context: str) -> str:
+    """
+    Combine a static instruction block with per-call context.
+
+    The static portion must come first and stay byte-identical across calls
+    so Anthropic's prompt-prefix cache can reuse its prefill; only the
+    trailing context tokens are recomputed.
+
+    Args:
+        static_prompt: Instructions, rules, and output schema shared by all calls
+        dynamic_context: Per-iteration data (task, state, history, files)
+
+    Returns:
+        The combined prompt string
+    """
+    return f"{static_prompt}\n\n### Current Context:\n{dynamic_context}"
+
 
 async def call_claude_code(
     prompt: str,
     options: Optional[ClaudeCodeOptions] = None,
-    extract_text: bool = True
+    extract_text: bool = True,
+    cache: Optional[LLMCache] = None
 ) -> str:
     """
     Call Claude Code SDK and return the response.
-    
+
     Args:
         prompt: The prompt to send to Claude
         options: Optional ClaudeCodeOptions for configuration
         extract_text: If True, extract only text content from response
-        
+        cache: Optional LLMCache; defaults to the shared cache when enabled
+
     Returns:
         The response from Claude as a string
     """
-    response_text = []
+    # Deterministic text-only calls (no tools) can be served from cache
+    cache_key = None
+    if extract_text and cache_enabled() and not (options and options.allowed_tools):
+        cache = cache or get_default_cache()
+        cache_key = LLMCache.make_key(
+            prompt=prompt,
+            system_prompt=options.system_prompt if options else None,
+            max_turns=options.max_turns if options else None
+        )
+        cached = await cache.get(cache_key)
+        if cached is not None:
+            return cached["text"]
+
+    # Accumulate streamed text in one buffer instead of a list + join
+    text_buf = io.StringIO()
     tool_uses = []
-    
+
     async for message in query(prompt=prompt, options=options):
         if isinstance(message, AssistantMessage):
             for block in message.content:
                 if isinstance(block, TextBlock) and extract_text:
-                    response_text.append(block.text)
+                    if text_buf.tell():
+                        text_buf.write("\n")
+                    text_buf.write(block.text)
                 elif isinstance(block, ToolUseBlock):
-                    tool_uses.append({
-                        "id": block.id,
-                        "name": block.name,
-                        "input": block.input
-                    })
+                    tool_uses.append(ToolUse(block.id, block.name, block.input))
         elif isinstance(message, ResultMessage):
             if message.total_cost_usd > 0:
                 print(f"[Claude Cost: ${message.total_cost_usd:.4f}]")
     
     if extract_text:
-        return "\n".join(response_text)
+        text = text_buf.getvalue()
+        if cache_key is not None:
+            await cache.set(cache_key, {"text": text})
+        return text
     else:
-        return json.dumps({"text": response_text, "tool_uses": tool_uses})
+        return json.dumps({
+            "text": text_buf.getvalue(),
+            "tool_uses": [tu._asdict() for tu in tool_uses]
+        })
 
 
 async def call_claude_with_tools(
@@ -84,24 +148,23 @@ async def call_claude_with_tools(
         permission_mode=permission_mode
     )
     
+    text_buf = io.StringIO()
     response = {
-        "text": [],
+        "text": "",
         "tool_uses": [],
         "tool_results": [],
         "cost": 0.0
     }
-    
+
     async for message in query(prompt=prompt, options=options):
         if isinstance(message, AssistantMessage):
             for block in message.content:
                 if isinstance(block, TextBlock):
-                    response["text"].append(block.text)
+                    if text_buf.tell():
+                        text_buf.write("\n")
+                    text_buf.write(block.text)
                 elif isinstance(block, ToolUseBlock):
-                    response["tool_uses"].append({
-                        "id": block.id,
-                        "name": block.name,
-                        "input": block.input
-                    })
+                    response["tool_uses"].append(ToolUse(block.id, block.name, block.input))
                 elif isinstance(block, ToolResultBlock):
                     response["tool_results"].append({
                         "tool_use_id": block.tool_use_id,
@@ -111,18 +174,25 @@ async def call_claude_with_tools(
         elif isinstance(message, ResultMessage):
             response["cost"] = message.total_cost_usd
     
-    response["text"] = "\n".join(response["text"])
+    response["text"] = text_buf.getvalue()
     return response
 
 
-async def parse_yaml_response(prompt: str, options: Optional[ClaudeCodeOptions] = None) -> Dict[str, Any]:
+async def parse_yaml_response(
+    prompt: str,
+    options: Optional[ClaudeCodeOptions] = None,
+    schema=None
+) -> Dict[str, Any]:
     """
     Call Claude and parse YAML response.
-    
+
     Args:
         prompt: The prompt requesting YAML output
         options: Optional ClaudeCodeOptions
-        
+        schema: Optional validator from utils.schemas; when given, the
+            parsed dict is checked (and defaults filled) before returning,
+            and shape mismatches surface as the usual error dict
+
     Returns:
         Parsed YAML as dictionary
     """
@@ -132,34 +202,22 @@ async def parse_yaml_response(prompt: str, options: Optional[ClaudeCodeOptions]
     if len(response) < 500:
         print(f"[DEBUG] Response: {response[:200]}...")
     
-    # Extract YAML block if wrapped in code fences
-    if "```yaml" in response:
-        yaml_str = response.split("```yaml")[1].split("```")[0].strip()
-    elif "```" in response:
-        # Try to extract any code block
-        yaml_str = response.split("```")[1].split("```")[0].strip()
-        # Remove language identifier if present
-        if yaml_str.startswith(('yaml', 'yml')):
-            lines = yaml_str.split('\n')
-            yaml_str = '\n'.join(lines[1:])
-    else:
-        yaml_str = response
-    
+    # Extract YAML block if wrapped in code fences (single pass, no splits)
+    match = _YAML_BLOCK_RE.search(response)
+    yaml_str = match.group(1) if match else response
+
     try:
-        parsed = yaml.safe_load(yaml_str)
+        parsed = yaml.load(yaml_str, Loader=_YamlLoader)
         # Ensure we return a dictionary
         if not isinstance(parsed, dict):
             print(f"YAML parsed to non-dict type: {type(parsed)}, value: {str(parsed)[:100]}")
-            # Try to extract structured data from string
-            if isinstance(parsed, str) and ':' in parsed:
-                # Attempt to re-parse as YAML
-                try:
-                    reparsed = yaml.safe_load(parsed)
-                    if isinstance(reparsed, dict):
-                        return reparsed
-                except:
-                    pass
             return {"error": "YAML did not parse to dictionary", "raw": response, "parsed": parsed}
+        if schema is not None:
+            try:
+                parsed = schema(parsed)
+            except SchemaError as e:
+                print(f"Response failed schema validation: {e}")
+                return {"error": f"Response shape invalid: {e}", "raw": response, "parsed": parsed}
         return parsed
     except yaml.YAMLError as e:
         print(f"Failed to parse YAML: {e}")
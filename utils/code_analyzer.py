@@ -6,6 +6,116 @@ from pathlib import Path
 from typing import Dict, List, Any, Optional
 import ast
 import re
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.ast_cache import get_or_parse
+from utils.project_cache import ProjectCache, get_project_cache
+
+# Below this many files, pool overhead beats the parallel win
+_MIN_FILES_FOR_POOL = 8
+
+
+def _map_file_work(func, paths):
+    """
+    Apply a per-file worker across paths on a thread pool.
+
+    The workers spend most of their time in read() syscalls, which
+    release the GIL, so line counting and comment scanning overlap disk
+    latency instead of serializing on it. Small batches run inline since
+    pool startup would dominate.
+
+    Args:
+        func: Callable taking one path and returning its result
+        paths: File paths to process
+
+    Returns:
+        List of results in the same order as paths
+    """
+    paths = list(paths)
+    if len(paths) < _MIN_FILES_FOR_POOL:
+        return [func(p) for p in paths]
+    workers = min(32, (os.cpu_count() or 4) * 4)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(func, paths))
+
+
+# Single case-insensitive bytes pattern scanned over whole file buffers.
+# [ \t] instead of \s keeps a match from straddling newlines, so one
+# finditer pass replaces the per-line Python loop; covers #, //, --, /* and
+# doc-comment * leaders.
+_TODO_RE = re.compile(
+    rb'(?:#|//|--|/\*|\*)[ \t]*(TODO|FIXME|HACK|NOTE|XXX):[ \t]*([^\r\n]+)',
+    re.IGNORECASE
+)
+
+
+# Files above this size are assumed generated/minified and not scanned
+_MAX_TODO_FILE_SIZE = 2_000_000
+
+# Extensions scanned for TODO-style comments
+_CODE_EXTS = frozenset({'.py', '.js', '.ts', '.java', '.cpp', '.c', '.go', '.rs', '.rb'})
+
+# Directories that never contain user code worth analyzing
+_SKIP_DIRS = frozenset({'node_modules', '__pycache__', 'venv', 'env', '.git'})
+
+# Depth at which the reported structure tree is truncated
+_TREE_MAX_DEPTH = 3
+
+# Soft ceiling on files per scan; pathological trees stop here with a warning
+_MAX_WALK_FILES = 1_000_000
+
+
+def _walk(root):
+    """
+    Yield DirEntry objects for every non-hidden file under root.
+
+    Uses an explicit os.scandir stack instead of Path.rglob/os.walk so the
+    is_file/is_dir answers come cached from the directory read itself
+    rather than costing a stat per entry. Hidden entries and the usual
+    vendor/cache directories are pruned without descending into them.
+
+    Args:
+        root: Directory to traverse (str or path-like)
+
+    Yields:
+        os.DirEntry for each file found
+    """
+    root = str(root)
+    try:
+        st = os.stat(root)
+    except OSError:
+        return
+    # (st_dev, st_ino) pairs of directories already entered; one extra
+    # stat per directory buys immunity to link loops back into the tree
+    visited = {(st.st_dev, st.st_ino)}
+    yielded = 0
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    if entry.name.startswith('.'):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name in _SKIP_DIRS:
+                            continue
+                        try:
+                            st = entry.stat(follow_symlinks=False)
+                        except OSError:
+                            continue
+                        key = (st.st_dev, st.st_ino)
+                        if key not in visited:
+                            visited.add(key)
+                            stack.append(entry.path)
+                    else:
+                        yielded += 1
+                        if yielded > _MAX_WALK_FILES:
+                            print(f"⚠️ Stopping scan at {_MAX_WALK_FILES} files under {root}")
+                            return
+                        yield entry
+        except PermissionError:
+            continue
 
 
 def analyze_project(project_path: str) -> Dict[str, Any]:
@@ -32,89 +142,152 @@ def analyze_project(project_path: str) -> Dict[str, Any]:
         "total_lines": 0
     }
     
-    # Analyze directory structure
-    for root, dirs, files in os.walk(path):
-        # Skip hidden and common ignore directories
-        dirs[:] = [d for d in dirs if not d.startswith('.') and d not in ['node_modules', '__pycache__', 'venv', 'env']]
-        
-        rel_root = Path(root).relative_to(path)
-        
-        for file in files:
-            if file.startswith('.'):
+    # One fused scandir DFS collects stats and builds the structure tree;
+    # a (path, depth, subtree) stack replaces the old second traversal,
+    # and the cached is_dir answers avoid a stat per entry
+    root_str = str(path)
+    cache = get_project_cache()
+    cached_lines = 0
+    file_specs = []
+    pending = []
+    tree = analysis["structure"]
+    try:
+        root_st = os.stat(root_str)
+    except OSError:
+        return {"error": f"Path {project_path} is not accessible"}
+    visited = {(root_st.st_dev, root_st.st_ino)}
+    stack = [(root_str, 0, tree)]
+    while stack:
+        current, depth, node = stack.pop()
+        try:
+            entries = sorted(os.scandir(current), key=lambda e: e.name)
+        except PermissionError:
+            if node is not None:
+                node["<permission_denied>"] = None
+            continue
+
+        for entry in entries:
+            name = entry.name
+            if name.startswith('.'):
+                continue
+
+            if entry.is_dir(follow_symlinks=False):
+                if name in _SKIP_DIRS:
+                    continue
+                try:
+                    dir_st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                dir_key = (dir_st.st_dev, dir_st.st_ino)
+                if dir_key in visited:
+                    continue
+                visited.add(dir_key)
+                if node is None:
+                    child = None
+                elif depth + 1 >= _TREE_MAX_DEPTH:
+                    # Keep descending for the counts; only the tree stops
+                    node[name + "/"] = {"...": "max_depth_reached"}
+                    child = None
+                else:
+                    child = node[name + "/"] = {}
+                stack.append((entry.path, depth + 1, child))
                 continue
-                
-            file_path = Path(root) / file
-            rel_path = file_path.relative_to(path)
-            ext = file_path.suffix
-            
+
+            if node is not None:
+                node[name] = "file"
+
+            rel_path = os.path.relpath(entry.path, root_str)
+            ext = os.path.splitext(name)[1]
+
             # Count file types
             analysis["file_types"][ext] = analysis["file_types"].get(ext, 0) + 1
             analysis["total_files"] += 1
-            
-            # Count lines
+            # Take the stat here while the entry is hot; DirEntry caches
+            # the result, and the (size, mtime_ns) signature decides
+            # whether the line count can come from the persistent cache
+            # without opening the file at all
             try:
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    lines = len(f.readlines())
-                    analysis["total_lines"] += lines
-            except:
-                pass
-            
+                st = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            if analysis["total_files"] > _MAX_WALK_FILES:
+                print(f"⚠️ Stopping analysis at {_MAX_WALK_FILES} files under {root_str}")
+                stack.clear()
+                break
+            signature = ProjectCache.signature(st.st_size, st.st_mtime_ns)
+            lines = cache.get_lines(rel_path, signature)
+            if lines is not None:
+                cached_lines += lines
+            elif st.st_size == 0:
+                cache.set_lines(rel_path, signature, 0)
+            else:
+                file_specs.append((entry.path, st.st_size))
+                pending.append((rel_path, signature))
+
             # Check for entry points
-            if file in ['main.py', 'app.py', 'index.js', 'main.js', 'index.ts', 'main.ts']:
-                analysis["entry_points"].append(str(rel_path))
-            
+            if name in ['main.py', 'app.py', 'index.js', 'main.js', 'index.ts', 'main.ts']:
+                analysis["entry_points"].append(rel_path)
+
             # Check for dependency files
-            if file in ['requirements.txt', 'package.json', 'Cargo.toml', 'go.mod', 'pom.xml']:
-                analysis["dependencies"][file] = str(rel_path)
-    
-    # Build directory tree structure
-    analysis["structure"] = build_tree_structure(path)
-    
+            if name in ['requirements.txt', 'package.json', 'Cargo.toml', 'go.mod', 'pom.xml']:
+                analysis["dependencies"][name] = rel_path
+
+    # Only changed files reach the counting workers; unchanged ones were
+    # already summed straight from the signature cache
+    counts = _map_file_work(_count_lines, file_specs)
+    for (rel_path, signature), lines in zip(pending, counts):
+        cache.set_lines(rel_path, signature, lines)
+    analysis["total_lines"] = cached_lines + sum(counts)
+
     return analysis
 
 
-def build_tree_structure(path: Path, max_depth: int = 3, current_depth: int = 0) -> Dict[str, Any]:
+# Read granularity for line counting; 1 MiB keeps memory flat on any file
+_COUNT_CHUNK = 1 << 20
+
+
+def _count_lines(spec) -> int:
     """
-    Build a tree structure of the directory.
-    
+    Count lines for one (path, size) pair from the project walk.
+
+    The size comes from the walk's cached stat, so empty files never
+    reach here. Reading in fixed 1 MiB chunks off an unbuffered handle
+    keeps peak memory flat no matter how large the file is, and
+    bytes.count runs as a C memchr loop over each chunk — no per-line
+    Python objects are ever created.
+
     Args:
-        path: Path to analyze
-        max_depth: Maximum depth to traverse
-        current_depth: Current traversal depth
-        
+        spec: Tuple of (file path, size in bytes)
+
     Returns:
-        Dictionary representing the tree structure
+        Line count, treating an unreadable file as empty
     """
-    if current_depth >= max_depth:
-        return {"...": "max_depth_reached"}
-    
-    tree = {}
-    
+    file_path, _ = spec
+    lines = 0
+    tail = b'\n'
     try:
-        for item in sorted(path.iterdir()):
-            if item.name.startswith('.'):
-                continue
-                
-            if item.is_dir():
-                if item.name not in ['node_modules', '__pycache__', 'venv', 'env', '.git']:
-                    tree[item.name + "/"] = build_tree_structure(item, max_depth, current_depth + 1)
-            else:
-                tree[item.name] = "file"
-    except PermissionError:
-        tree["<permission_denied>"] = None
-    
-    return tree
+        with open(file_path, 'rb', buffering=0) as f:
+            while chunk := f.read(_COUNT_CHUNK):
+                lines += chunk.count(b'\n')
+                tail = chunk[-1:]
+    except OSError:
+        return 0
+    # A file not ending in a newline still has that final partial line
+    return lines + (tail != b'\n')
 
 
-def analyze_python_file(file_path: str) -> Dict[str, Any]:
+def _analyze_source(content: bytes) -> Dict[str, Any]:
     """
-    Analyze a Python file for its structure.
-    
+    Run the AST traversal for one file's source bytes.
+
     Args:
-        file_path: Path to the Python file
-        
+        content: Raw bytes of the Python source
+
     Returns:
         Dictionary containing file analysis
+
+    Raises:
+        SyntaxError: If the source does not parse
     """
     analysis = {
         "classes": [],
@@ -122,48 +295,73 @@ def analyze_python_file(file_path: str) -> Dict[str, Any]:
         "imports": [],
         "docstring": None
     }
-    
+
+    tree = ast.parse(content)
+
+    # Get module docstring (one call, reused; clean=False skips the
+    # dedent pass since the raw text is all we report)
+    docstring = ast.get_docstring(tree, clean=False)
+    if docstring:
+        analysis["docstring"] = docstring
+
+    # Top-level means direct children of the module, so one pass over
+    # tree.body covers everything — no ast.walk over the whole tree, and
+    # no re-walk per function to guess at its enclosing scope
+    for node in tree.body:
+        # Find classes
+        if isinstance(node, ast.ClassDef):
+            analysis["classes"].append({
+                "name": node.name,
+                "methods": [
+                    m.name for m in node.body
+                    if isinstance(m, (ast.FunctionDef, ast.AsyncFunctionDef))
+                ],
+                "docstring": ast.get_docstring(node, clean=False)
+            })
+
+        # Find top-level functions
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            analysis["functions"].append({
+                "name": node.name,
+                "args": [arg.arg for arg in node.args.args],
+                "docstring": ast.get_docstring(node, clean=False)
+            })
+
+        # Find imports
+        elif isinstance(node, ast.Import):
+            for alias in node.names:
+                analysis["imports"].append(alias.name)
+        elif isinstance(node, ast.ImportFrom):
+            module = node.module or ''
+            for alias in node.names:
+                analysis["imports"].append(f"{module}.{alias.name}")
+
+    return analysis
+
+
+def analyze_python_file(file_path: str) -> Dict[str, Any]:
+    """
+    Analyze a Python file for its structure.
+
+    Results are served from the on-disk AST cache when the file's content
+    hash matches a previous run, so warm calls skip ast.parse entirely.
+
+    Args:
+        file_path: Path to the Python file
+
+    Returns:
+        Dictionary containing file analysis
+    """
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        tree = ast.parse(content)
-        
-        # Get module docstring
-        if ast.get_docstring(tree):
-            analysis["docstring"] = ast.get_docstring(tree)
-        
-        for node in ast.walk(tree):
-            # Find classes
-            if isinstance(node, ast.ClassDef):
-                analysis["classes"].append({
-                    "name": node.name,
-                    "methods": [m.name for m in node.body if isinstance(m, ast.FunctionDef)],
-                    "docstring": ast.get_docstring(node)
-                })
-            
-            # Find top-level functions
-            elif isinstance(node, ast.FunctionDef):
-                if not any(isinstance(parent, ast.ClassDef) for parent in ast.walk(tree)):
-                    analysis["functions"].append({
-                        "name": node.name,
-                        "args": [arg.arg for arg in node.args.args],
-                        "docstring": ast.get_docstring(node)
-                    })
-            
-            # Find imports
-            elif isinstance(node, ast.Import):
-                for alias in node.names:
-                    analysis["imports"].append(alias.name)
-            elif isinstance(node, ast.ImportFrom):
-                module = node.module or ''
-                for alias in node.names:
-                    analysis["imports"].append(f"{module}.{alias.name}")
-    
+        return get_or_parse(file_path, _analyze_source)
     except Exception as e:
-        analysis["error"] = str(e)
-    
-    return analysis
+        return {
+            "classes": [],
+            "functions": [],
+            "imports": [],
+            "docstring": None,
+            "error": str(e)
+        }
 
 
 def find_similar_files(project_path: str, reference_file: str) -> List[str]:
@@ -177,20 +375,23 @@ def find_similar_files(project_path: str, reference_file: str) -> List[str]:
     Returns:
         List of similar file paths
     """
-    path = Path(project_path)
-    ref_path = Path(reference_file)
-    ref_name = ref_path.stem
-    ref_ext = ref_path.suffix
-    
+    ref_name, ref_ext = os.path.splitext(os.path.basename(reference_file))
+    ref_name = ref_name.lower()
+
     similar_files = []
-    
-    for file_path in path.rglob(f"*{ref_ext}"):
-        if file_path.is_file():
-            # Check for similar naming patterns
-            if (ref_name.lower() in file_path.stem.lower() or
-                file_path.stem.lower() in ref_name.lower()):
-                similar_files.append(str(file_path.relative_to(path)))
-    
+
+    # The shared scandir walk prunes vendor directories at the boundary
+    # instead of materializing a Path per entry the way rglob does
+    root_str = str(project_path)
+    for entry in _walk(root_str):
+        stem, ext = os.path.splitext(entry.name)
+        if ext != ref_ext:
+            continue
+        # Check for similar naming patterns
+        stem = stem.lower()
+        if ref_name in stem or stem in ref_name:
+            similar_files.append(os.path.relpath(entry.path, root_str))
+
     return similar_files
 
 
@@ -205,25 +406,55 @@ def extract_todo_comments(project_path: str) -> List[Dict[str, str]]:
         List of TODO items with file location
     """
     path = Path(project_path)
-    todo_pattern = re.compile(r'#\s*(TODO|FIXME|HACK|NOTE|XXX):\s*(.+)', re.IGNORECASE)
     todos = []
-    
-    for file_path in path.rglob('*'):
-        if file_path.is_file() and file_path.suffix in ['.py', '.js', '.ts', '.java', '.cpp', '.c', '.go']:
-            try:
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    for line_num, line in enumerate(f, 1):
-                        match = todo_pattern.search(line)
-                        if match:
-                            todos.append({
-                                "file": str(file_path.relative_to(path)),
-                                "line": line_num,
-                                "type": match.group(1).upper(),
-                                "message": match.group(2).strip()
-                            })
-            except:
-                pass
-    
+
+    root_str = str(path)
+    candidates = [
+        entry.path for entry in _walk(root_str)
+        if os.path.splitext(entry.name)[1] in _CODE_EXTS
+    ]
+
+    def _scan(file_path):
+        # Read and scan inside the worker so files overlap on disk latency
+        try:
+            with open(file_path, 'rb') as f:
+                # Oversized files are generated bundles, not source worth
+                # scanning; a NUL in the first 8 KB marks a binary blob
+                # that merely borrowed a source extension
+                if os.fstat(f.fileno()).st_size > _MAX_TODO_FILE_SIZE:
+                    return ()
+                head = f.read(8192)
+                if b'\x00' in head:
+                    return ()
+                data = head + f.read()
+        except OSError:
+            return ()
+        found = []
+        # One pass over the raw buffer; line numbers come from counting
+        # newlines only between consecutive matches
+        line_num = 1
+        pos = 0
+        for match in _TODO_RE.finditer(data):
+            start = match.start()
+            line_num += data.count(b'\n', pos, start)
+            pos = start
+            found.append((
+                line_num,
+                match.group(1).decode('ascii').upper(),
+                match.group(2).decode('utf-8', errors='ignore').strip()
+            ))
+        return found
+
+    for file_path, found in zip(candidates, _map_file_work(_scan, candidates)):
+        rel_path = os.path.relpath(file_path, root_str)
+        for line_num, kind, message in found:
+            todos.append({
+                "file": rel_path,
+                "line": line_num,
+                "type": kind,
+                "message": message
+            })
+
     return todos
 
 
@@ -0,0 +1,150 @@
+"""Response caching for deterministic Claude calls."""
+
+import os
+import json
+import time
+import hashlib
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Protocol
+
+
+class CacheBackend(Protocol):
+    """Storage backend for cached LLM responses."""
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached value for key, or None on miss/expiry."""
+        ...
+
+    async def set(self, key: str, value: Dict[str, Any], ttl: Optional[float] = None):
+        """Store a value under key with an optional TTL in seconds."""
+        ...
+
+
+class MemoryCacheBackend:
+    """In-process backend with LRU eviction and per-entry TTL."""
+
+    def __init__(self, max_entries: int = 256, default_ttl: float = 3600.0):
+        """
+        Initialize the backend.
+
+        Args:
+            max_entries: Maximum number of cached responses before LRU eviction
+            default_ttl: Default time-to-live in seconds for entries
+        """
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+
+        # Refresh LRU position on hit
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Dict[str, Any], ttl: Optional[float] = None):
+        expires_at = time.monotonic() + (ttl if ttl is not None else self.default_ttl)
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class RedisCacheBackend:
+    """Redis-backed cache for sharing responses across processes."""
+
+    def __init__(self, url: str = "redis://localhost:6379/0", default_ttl: float = 3600.0,
+                 prefix: str = "pocketclaude:llm:"):
+        """
+        Initialize the backend.
+
+        Args:
+            url: Redis connection URL
+            default_ttl: Default time-to-live in seconds for entries
+            prefix: Key prefix to namespace cache entries
+        """
+        import redis.asyncio as redis  # Optional dependency, imported lazily
+
+        self.default_ttl = default_ttl
+        self.prefix = prefix
+        self._client = redis.from_url(url)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raw = await self._client.get(self.prefix + key)
+        if raw is None:
+            return None
+        try:
+            return json.loads(raw)
+        except (ValueError, TypeError):
+            return None
+
+    async def set(self, key: str, value: Dict[str, Any], ttl: Optional[float] = None):
+        ttl = ttl if ttl is not None else self.default_ttl
+        await self._client.set(self.prefix + key, json.dumps(value), ex=int(ttl))
+
+
+class LLMCache:
+    """Exact-match cache for deterministic LLM calls."""
+
+    def __init__(self, backend: Optional[CacheBackend] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            backend: Storage backend; defaults to an in-memory LRU
+        """
+        self.backend = backend or MemoryCacheBackend()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(**parts: Any) -> str:
+        """
+        Build a stable cache key from the parts that determine a response.
+
+        Args:
+            **parts: Request attributes (prompt, system prompt, tools, ...)
+
+        Returns:
+            Hex SHA-256 digest of the canonical JSON encoding
+        """
+        canonical = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look up a cached response, tracking hit/miss counts."""
+        value = await self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: Dict[str, Any], ttl: Optional[float] = None):
+        """Store a response for future identical calls."""
+        await self.backend.set(key, value, ttl)
+
+
+# Module-level cache shared by all flows in this process
+_default_cache: Optional[LLMCache] = None
+
+
+def get_default_cache() -> LLMCache:
+    """Return the process-wide LLM cache, creating it on first use."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = LLMCache()
+    return _default_cache
+
+
+def cache_enabled() -> bool:
+    """Check whether response caching is enabled (POCKETCLAUDE_LLM_CACHE=0 disables)."""
+    return os.getenv("POCKETCLAUDE_LLM_CACHE", "1") != "0"
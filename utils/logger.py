@@ -1,16 +1,70 @@
 """Logging and sharing utilities for Claude Code Subagent."""
 
+import io
 import json
 import os
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, Any, Optional, List
 import asyncio
+import collections
 import aiohttp
 
 
+def _fmt_plan_created(timestamp: str, data: Dict[str, Any]) -> str:
+    parts = [f"\n### 📋 {timestamp} - Plan Created\n"]
+    if "steps" in data:
+        parts.extend(
+            f"  {i}. {step.get('name', 'Step')}\n"
+            for i, step in enumerate(data["steps"], 1)
+        )
+    return "".join(parts)
+
+
+def _fmt_decision_made(timestamp: str, data: Dict[str, Any]) -> str:
+    return (
+        f"\n### 🤔 {timestamp} - Decision: {data.get('action', 'unknown').upper()}\n"
+        f"  - Reasoning: {data.get('reasoning', 'N/A')}\n"
+    )
+
+
+def _fmt_step_started(timestamp: str, data: Dict[str, Any]) -> str:
+    return (
+        f"\n### 🔨 {timestamp} - Started: {data.get('name', 'Step')}\n"
+        f"  - Type: {data.get('type', 'N/A')}\n"
+    )
+
+
+def _fmt_file_created(timestamp: str, data: Dict[str, Any]) -> str:
+    return (
+        f"\n### 📄 {timestamp} - File Created\n"
+        f"  - Path: `{data.get('path', 'unknown')}`\n"
+    )
+
+
+def _fmt_error(timestamp: str, data: Dict[str, Any]) -> str:
+    return (
+        f"\n### ❌ {timestamp} - Error\n"
+        f"  - {data.get('message', 'Unknown error')}\n"
+    )
+
+
+# Event-type dispatch for the report timeline; new event types only need
+# a formatter and an entry here, not another elif in the render loop
+_REPORT_HANDLERS = {
+    "plan_created": _fmt_plan_created,
+    "decision_made": _fmt_decision_made,
+    "step_started": _fmt_step_started,
+    "file_created": _fmt_file_created,
+    "error": _fmt_error,
+}
+
+
 class AgentLogger:
     """Logger that saves agent actions to file and can share via various methods."""
+
+    # Most events coalesced into one write() by the background writer
+    max_batch_size = 32
     
     def __init__(self, log_dir: str = "./logs", enable_file: bool = True, enable_webhook: bool = False):
         """
@@ -29,24 +83,34 @@ class AgentLogger:
         # Create session ID for this run
         self.session_id = datetime.now().strftime("%Y%m%d_%H%M%S")
         self.log_file = None
+
+        # One HTTP session for every webhook POST, created lazily on the
+        # first event so connections keep alive across events
+        self._http_session: Optional[aiohttp.ClientSession] = None
+
+        # Queue + task of the background file writer, started lazily on
+        # the first event logged under a running loop
+        self._event_queue: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
         
         if self.enable_file:
             self.log_dir.mkdir(parents=True, exist_ok=True)
-            self.log_file = self.log_dir / f"agent_log_{self.session_id}.json"
+            # Line-delimited JSON: one header line, then one event per line,
+            # so each event is an O(1) append instead of a full-file rewrite
+            self.log_file = self.log_dir / f"agent_log_{self.session_id}.jsonl"
             self.markdown_file = self.log_dir / f"agent_report_{self.session_id}.md"
-            
+
             # Initialize log file
             self._init_log_file()
-    
+
     def _init_log_file(self):
-        """Initialize the JSON log file."""
-        initial_data = {
+        """Write the session header line to the log file."""
+        header = {
             "session_id": self.session_id,
-            "start_time": datetime.now().isoformat(),
-            "events": []
+            "start_time": datetime.now().isoformat()
         }
         with open(self.log_file, 'w') as f:
-            json.dump(initial_data, f, indent=2)
+            f.write(json.dumps(header) + "\n")
     
     def log_event(self, event_type: str, data: Dict[str, Any]):
         """
@@ -62,9 +126,14 @@ class AgentLogger:
             "data": data
         }
         
-        # Save to file
+        # Save to file: a queue put when the agent loop is running, so the
+        # hot path never blocks on disk; direct append otherwise
         if self.enable_file and self.log_file:
-            self._append_to_log(event)
+            queue = self._ensure_writer()
+            if queue is not None:
+                queue.put_nowait(event)
+            else:
+                self._append_to_log(event)
         
         # Send to webhook (async)
         if self.enable_webhook and self.webhook_url:
@@ -73,101 +142,195 @@ class AgentLogger:
         return event
     
     def _append_to_log(self, event: Dict[str, Any]):
-        """Append event to log file."""
+        """Append event to log file as a single NDJSON line."""
+        self._flush_batch([event])
+
+    def _flush_batch(self, events: List[Dict[str, Any]]):
+        """Append a batch of events to the log in one write."""
         try:
-            with open(self.log_file, 'r') as f:
-                log_data = json.load(f)
-            
-            log_data["events"].append(event)
-            log_data["last_updated"] = datetime.now().isoformat()
-            
-            with open(self.log_file, 'w') as f:
-                json.dump(log_data, f, indent=2)
+            with open(self.log_file, 'a') as f:
+                f.write("".join(
+                    json.dumps(event, separators=(",", ":")) + "\n"
+                    for event in events
+                ))
         except Exception as e:
             print(f"Error saving to log: {e}")
+
+    def _ensure_writer(self) -> Optional[asyncio.Queue]:
+        """Return the writer queue, starting the writer task if a loop runs."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+        if self._event_queue is None:
+            self._event_queue = asyncio.Queue()
+            self._writer_task = loop.create_task(self._writer_loop())
+        return self._event_queue
+
+    async def _writer_loop(self):
+        """Drain queued events, coalescing bursts into batched appends."""
+        while True:
+            event = await self._event_queue.get()
+            if event is None:
+                break
+            batch = [event]
+            # Take whatever else is already waiting, up to the batch cap,
+            # so a burst of events becomes a single write() call
+            while len(batch) < self.max_batch_size and not self._event_queue.empty():
+                event = self._event_queue.get_nowait()
+                if event is None:
+                    self._flush_batch(batch)
+                    return
+                batch.append(event)
+            self._flush_batch(batch)
+
+    def finalize(self) -> Optional[Path]:
+        """
+        Roll the per-event NDJSON log into a single aggregate JSON file.
+
+        Events append as O(1) lines during the session; callers that want
+        the old whole-session object (header plus an "events" array) call
+        this once at the end instead of paying a rewrite per event.
+
+        Returns:
+            Path of the aggregate file, or None when file logging is off
+        """
+        if not self.log_file or not self.log_file.exists():
+            return None
+
+        aggregate_file = self.log_file.with_suffix(".json")
+        with open(aggregate_file, 'w') as f:
+            json.dump(self._load_log(), f, indent=2)
+        return aggregate_file
+
+    def _load_log(self) -> Dict[str, Any]:
+        """Load the NDJSON log back into header + events form."""
+        log_data = {"session_id": self.session_id, "start_time": None, "events": []}
+
+        with open(self.log_file, 'r') as f:
+            for line_num, line in enumerate(f):
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                if line_num == 0:
+                    log_data.update(record)
+                else:
+                    log_data["events"].append(record)
+
+        if log_data["events"]:
+            log_data["last_updated"] = log_data["events"][-1].get("timestamp")
+
+        return log_data
     
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Return the shared HTTP session, creating it on first use."""
+        if self._http_session is None or self._http_session.closed:
+            self._http_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=16,
+                    ttl_dns_cache=300,
+                    keepalive_timeout=60
+                )
+            )
+        return self._http_session
+
     async def _send_to_webhook(self, event: Dict[str, Any]):
         """Send event to webhook."""
         try:
-            async with aiohttp.ClientSession() as session:
-                payload = {
-                    "session_id": self.session_id,
-                    "event": event
-                }
-                async with session.post(self.webhook_url, json=payload) as response:
-                    if response.status != 200:
-                        print(f"Webhook failed: {response.status}")
+            session = await self._get_session()
+            payload = {
+                "session_id": self.session_id,
+                "event": event
+            }
+            async with session.post(self.webhook_url, json=payload) as response:
+                if response.status != 200:
+                    print(f"Webhook failed: {response.status}")
         except Exception as e:
             print(f"Webhook error: {e}")
+
+    async def close(self):
+        """Close the shared HTTP session (call once at end of session)."""
+        if self._http_session is not None and not self._http_session.closed:
+            await self._http_session.close()
+        self._http_session = None
+
+    async def aclose(self):
+        """Flush and stop the background writer, then release the session."""
+        if self._event_queue is not None:
+            self._event_queue.put_nowait(None)
+            try:
+                await self._writer_task
+            except asyncio.CancelledError:
+                pass
+            self._event_queue = None
+            self._writer_task = None
+        await self.close()
     
     def generate_markdown_report(self) -> str:
-        """Generate a markdown report of the session."""
+        """Generate a markdown report of the session.
+
+        The log is streamed line by line in a single pass: events render
+        straight into a string buffer while plain int counters collect
+        the summary, so no intermediate event list or per-type grouping
+        is ever materialized.
+        """
         if not self.log_file or not self.log_file.exists():
             return "No log data available"
-        
+
+        start_time = None
+        last_updated = None
+        total_events = 0
+        files_created = 0
+        errors = 0
+        timeline = io.StringIO()
+
         with open(self.log_file, 'r') as f:
-            log_data = json.load(f)
-        
+            for line_num, line in enumerate(f):
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                if line_num == 0:
+                    start_time = record.get("start_time")
+                    continue
+
+                total_events += 1
+                last_updated = record.get("timestamp", "")
+                # ISO timestamps put HH:MM:SS at fixed offsets; a slice
+                # beats two throwaway split lists per event
+                timestamp = last_updated[11:19]
+                event_type = record["type"]
+
+                handler = _REPORT_HANDLERS.get(event_type)
+                if handler is not None:
+                    timeline.write(handler(timestamp, record["data"]))
+                if event_type == "file_created":
+                    files_created += 1
+                elif event_type == "error":
+                    errors += 1
+
         report = f"""# Claude Code Subagent Session Report
 
-**Session ID:** {log_data['session_id']}  
-**Start Time:** {log_data['start_time']}  
-**Last Updated:** {log_data.get('last_updated', 'N/A')}
+**Session ID:** {self.session_id}  
+**Start Time:** {start_time}  
+**Last Updated:** {last_updated or 'N/A'}
 
 ## Timeline of Events
 
+{timeline.getvalue()}
+## Summary
+
+- **Total Events:** {total_events}
+- **Files Created:** {files_created}
+- **Errors:** {errors}
 """
-        
-        # Group events by type
-        events_by_type = {}
-        for event in log_data["events"]:
-            event_type = event["type"]
-            if event_type not in events_by_type:
-                events_by_type[event_type] = []
-            events_by_type[event_type].append(event)
-        
-        # Add events to report
-        for event in log_data["events"]:
-            timestamp = event["timestamp"].split("T")[1].split(".")[0]  # Get time only
-            event_type = event["type"]
-            data = event["data"]
-            
-            if event_type == "plan_created":
-                report += f"\n### 📋 {timestamp} - Plan Created\n"
-                if "steps" in data:
-                    for i, step in enumerate(data["steps"], 1):
-                        report += f"  {i}. {step.get('name', 'Step')}\n"
-            
-            elif event_type == "decision_made":
-                report += f"\n### 🤔 {timestamp} - Decision: {data.get('action', 'unknown').upper()}\n"
-                report += f"  - Reasoning: {data.get('reasoning', 'N/A')}\n"
-            
-            elif event_type == "step_started":
-                report += f"\n### 🔨 {timestamp} - Started: {data.get('name', 'Step')}\n"
-                report += f"  - Type: {data.get('type', 'N/A')}\n"
-            
-            elif event_type == "file_created":
-                report += f"\n### 📄 {timestamp} - File Created\n"
-                report += f"  - Path: `{data.get('path', 'unknown')}`\n"
-            
-            elif event_type == "error":
-                report += f"\n### ❌ {timestamp} - Error\n"
-                report += f"  - {data.get('message', 'Unknown error')}\n"
-        
-        # Add summary
-        report += "\n## Summary\n\n"
-        file_events = events_by_type.get("file_created", [])
-        error_events = events_by_type.get("error", [])
-        
-        report += f"- **Total Events:** {len(log_data['events'])}\n"
-        report += f"- **Files Created:** {len(file_events)}\n"
-        report += f"- **Errors:** {len(error_events)}\n"
-        
+
         # Save markdown report
         if self.markdown_file:
             with open(self.markdown_file, 'w') as f:
                 f.write(report)
-        
+
         return report
     
     def get_shareable_link(self) -> str:
@@ -233,15 +396,49 @@ class LiveShareServer:
     def __init__(self, port: int = 8080):
         """Initialize live share server."""
         self.port = port
-        self.events = []
+        # Ring buffer: O(1) appends and the oldest entry falls off free
+        self.events = collections.deque(maxlen=100)
+        # One queue per connected /stream client; add_event pushes deltas
+        self._subscribers = set()
         
     async def start(self):
         """Start the web server."""
         from aiohttp import web
         
         async def handle_events(request):
-            """Return current events as JSON."""
-            return web.json_response(self.events)
+            """Return current events as JSON (fallback for non-SSE clients)."""
+            # Cheap ETag from the feed position lets pollers get a 304
+            # instead of the full list when nothing changed
+            etag = f'"{len(self.events)}-{self.events[-1]["timestamp"] if self.events else ""}"'
+            if request.headers.get('If-None-Match') == etag:
+                return web.Response(status=304)
+            response = web.json_response(list(self.events))
+            response.headers['ETag'] = etag
+            return response
+
+        async def handle_stream(request):
+            """Push each new event to the client over Server-Sent Events."""
+            response = web.StreamResponse(headers={
+                'Content-Type': 'text/event-stream',
+                'Cache-Control': 'no-cache',
+                'Connection': 'keep-alive'
+            })
+            await response.prepare(request)
+
+            queue = asyncio.Queue()
+            self._subscribers.add(queue)
+            try:
+                # Replay the buffered feed so late joiners see history
+                for event in list(self.events):
+                    await response.write(f"data: {json.dumps(event)}\n\n".encode())
+                while True:
+                    event = await queue.get()
+                    await response.write(f"data: {json.dumps(event)}\n\n".encode())
+            except (ConnectionResetError, asyncio.CancelledError):
+                pass
+            finally:
+                self._subscribers.discard(queue)
+            return response
         
         async def handle_index(request):
             """Return simple HTML interface."""
@@ -263,20 +460,23 @@ class LiveShareServer:
     <h1>🤖 Claude Code Subagent - Live Progress</h1>
     <div id="events"></div>
     <script>
-        async function updateEvents() {
-            const response = await fetch('/events');
-            const events = await response.json();
-            const container = document.getElementById('events');
-            container.innerHTML = events.map(e => `
-                <div class="event">
-                    <span class="timestamp">${e.timestamp}</span>
-                    <span class="type">${e.type}</span>
-                    <pre class="data">${JSON.stringify(e.data, null, 2)}</pre>
-                </div>
-            `).join('');
-        }
-        setInterval(updateEvents, 1000);
-        updateEvents();
+        // Server pushes each event as it happens; no polling loop
+        const container = document.getElementById('events');
+        const source = new EventSource('/stream');
+        source.onmessage = (msg) => {
+            const e = JSON.parse(msg.data);
+            const div = document.createElement('div');
+            div.className = 'event';
+            div.innerHTML = `
+                <span class="timestamp">${e.timestamp}</span>
+                <span class="type">${e.type}</span>
+                <pre class="data">${JSON.stringify(e.data, null, 2)}</pre>
+            `;
+            container.appendChild(div);
+            while (container.childElementCount > 100) {
+                container.removeChild(container.firstElementChild);
+            }
+        };
     </script>
 </body>
 </html>
@@ -286,6 +486,7 @@ class LiveShareServer:
         app = web.Application()
         app.router.add_get('/', handle_index)
         app.router.add_get('/events', handle_events)
+        app.router.add_get('/stream', handle_stream)
         
         runner = web.AppRunner(app)
         await runner.setup()
@@ -295,11 +496,10 @@ class LiveShareServer:
         print(f"🌐 Live progress available at: http://localhost:{self.port}")
         
     def add_event(self, event: Dict[str, Any]):
-        """Add an event to the live feed."""
+        """Add an event to the live feed and push it to SSE subscribers."""
         self.events.append(event)
-        # Keep only last 100 events
-        if len(self.events) > 100:
-            self.events.pop(0)
+        for queue in self._subscribers:
+            queue.put_nowait(event)
 
 
 # Test the logger
@@ -0,0 +1,119 @@
+"""Persistent plan-level caching for deterministic node decisions."""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+_DEFAULT_DB_PATH = Path("./.pocketclaude_cache/plans.db")
+
+
+def plan_cache_enabled() -> bool:
+    """Whether the persistent plan cache is active (opt-in via POCKETCLAUDE_CACHE=1)."""
+    return os.environ.get("POCKETCLAUDE_CACHE") == "1"
+
+
+class PlanCache:
+    """SQLite-backed cache mapping node fingerprints to parsed response dicts.
+
+    Unlike the in-process response cache in llm_cache, entries persist
+    across runs, so re-running the agent on a similar task skips the full
+    LLM round-trip for requirements, decisions, and plans on a hit.
+    """
+
+    def __init__(self, db_path: Optional[Path] = None, default_ttl: float = 86400.0):
+        """
+        Open (or create) the cache database.
+
+        Args:
+            db_path: Location of the SQLite file; parent dirs are created
+            default_ttl: Default time-to-live in seconds for entries
+        """
+        path = Path(db_path) if db_path else _DEFAULT_DB_PATH
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS plans ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(node: str, **fingerprint: Any) -> str:
+        """
+        Build a cache key from a node name and its state fingerprint.
+
+        The fingerprint should contain only the state that actually
+        determines the response (e.g. for decisions: state, has_plan,
+        has_impl, has_errors, plan_count — not the full history), so that
+        near-identical points in different runs map to the same key.
+
+        Args:
+            node: Short node identifier (e.g. "decide")
+            **fingerprint: State values that determine the response
+
+        Returns:
+            A prefixed hex digest usable as the cache key
+        """
+        canonical = json.dumps(fingerprint, sort_keys=True, default=str)
+        digest = hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).hexdigest()
+        return f"{node}:{digest}"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached dict for key, or None on miss/expiry."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM plans WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at < time.time():
+                self._conn.execute("DELETE FROM plans WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+        return json.loads(value)
+
+    def set(self, key: str, value: Dict[str, Any], ttl: Optional[float] = None):
+        """Store a dict under key with an optional TTL in seconds."""
+        expires_at = time.time() + (ttl if ttl is not None else self.default_ttl)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO plans (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), expires_at)
+            )
+            self._conn.commit()
+
+    def invalidate(self, node: Optional[str] = None):
+        """
+        Drop cached entries, optionally only one node's.
+
+        Args:
+            node: Node prefix as passed to make_key (e.g. "decide");
+                when None the whole table is cleared
+        """
+        with self._lock:
+            if node is None:
+                self._conn.execute("DELETE FROM plans")
+            else:
+                self._conn.execute(
+                    "DELETE FROM plans WHERE key LIKE ?", (f"{node}:%",)
+                )
+            self._conn.commit()
+
+
+_default_cache: Optional[PlanCache] = None
+
+
+def get_plan_cache() -> PlanCache:
+    """Return the process-wide plan cache, creating it on first use."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = PlanCache()
+    return _default_cache
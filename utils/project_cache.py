@@ -0,0 +1,85 @@
+"""Persistent per-file signature cache for warm project re-analysis."""
+
+import os
+import json
+import atexit
+import threading
+from pathlib import Path
+from typing import Optional
+
+_DEFAULT_CACHE_PATH = Path("./.pocketclaude_cache/project.json")
+
+
+class ProjectCache:
+    """Maps project-relative paths to a (signature, line count) pair.
+
+    The signature is the file's raw (size, mtime_ns) pair as reported by
+    the directory walk's cached stat — the exact fields a change would
+    move, so hashing them would only add indirection. A warm
+    analyze_project run compares signatures and skips opening any file
+    whose pair is unchanged, leaving only the mtime scan it already paid
+    for.
+    """
+
+    def __init__(self, cache_path: Optional[Path] = None):
+        """
+        Load the cache file if present; entries persist at process exit.
+
+        Args:
+            cache_path: Location of the JSON cache; parent dirs are
+                created on first save
+        """
+        self._path = Path(cache_path) if cache_path else _DEFAULT_CACHE_PATH
+        self._lock = threading.Lock()
+        self._dirty = False
+        try:
+            with open(self._path, 'r') as f:
+                self._entries = json.load(f)
+        except (OSError, ValueError):
+            self._entries = {}
+        atexit.register(self.save)
+
+    @staticmethod
+    def signature(size: int, mtime_ns: int) -> str:
+        """Build the change signature for one file's stat result."""
+        return f"{size}:{mtime_ns}"
+
+    def get_lines(self, rel_path: str, signature: str) -> Optional[int]:
+        """Return the cached line count, or None if the file changed."""
+        entry = self._entries.get(rel_path)
+        if entry is not None and entry[0] == signature:
+            return entry[1]
+        return None
+
+    def set_lines(self, rel_path: str, signature: str, lines: int):
+        """Record the line count for a file at its current signature."""
+        with self._lock:
+            self._entries[rel_path] = [signature, lines]
+            self._dirty = True
+
+    def save(self):
+        """Write the cache back to disk if anything changed."""
+        with self._lock:
+            if not self._dirty:
+                return
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self._path.with_suffix(f".{os.getpid()}.tmp")
+            try:
+                with open(tmp, 'w') as f:
+                    json.dump(self._entries, f, separators=(",", ":"))
+                os.replace(tmp, self._path)
+            except OSError:
+                tmp.unlink(missing_ok=True)
+                return
+            self._dirty = False
+
+
+_default_cache: Optional[ProjectCache] = None
+
+
+def get_project_cache() -> ProjectCache:
+    """Return the process-wide project cache, creating it on first use."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ProjectCache()
+    return _default_cache
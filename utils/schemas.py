@@ -0,0 +1,72 @@
+"""Response-shape validators for the YAML structures each node expects."""
+
+from typing import Any, Dict
+
+
+class SchemaError(ValueError):
+    """Raised when a parsed response doesn't match the expected shape."""
+
+
+def _require(parsed: Dict[str, Any], field: str, kind: type) -> Any:
+    value = parsed.get(field)
+    if not isinstance(value, kind):
+        raise SchemaError(
+            f"expected '{field}' to be {kind.__name__}, got {type(value).__name__}"
+        )
+    return value
+
+
+def requirements_response(parsed: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Validate the UnderstandRequirements shape and fill list defaults.
+
+    Args:
+        parsed: Parsed YAML dictionary
+
+    Returns:
+        The validated dictionary
+
+    Raises:
+        SchemaError: If 'requirements' is missing or malformed
+    """
+    requirements = _require(parsed, "requirements", dict)
+    for field in ("features", "constraints", "suggested_tech", "deliverables"):
+        requirements.setdefault(field, [])
+    return parsed
+
+
+def decision_response(parsed: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Validate the DecideAction shape.
+
+    Args:
+        parsed: Parsed YAML dictionary
+
+    Returns:
+        The validated dictionary with a reasoning default
+
+    Raises:
+        SchemaError: If 'action' is missing or not a string
+    """
+    _require(parsed, "action", str)
+    parsed.setdefault("reasoning", "Continuing development")
+    return parsed
+
+
+def plan_response(parsed: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Validate the decompose_task shape.
+
+    Args:
+        parsed: Parsed YAML dictionary
+
+    Returns:
+        The validated dictionary
+
+    Raises:
+        SchemaError: If 'steps' is missing or not a list of dicts
+    """
+    steps = _require(parsed, "steps", list)
+    if not all(isinstance(step, dict) for step in steps):
+        raise SchemaError("expected every entry in 'steps' to be a mapping")
+    return parsed
@@ -1,10 +1,18 @@
 """Task decomposition utilities for breaking down complex coding tasks."""
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import json
+from collections import deque
 from utils.claude_interface import call_claude_code, parse_yaml_response
+from utils.schemas import plan_response
 from claude_code_sdk import ClaudeCodeOptions
 
+# Shared across calls; the options never vary, so build them once at import
+_DECOMPOSE_OPTIONS = ClaudeCodeOptions(
+    system_prompt="You are an expert software architect who creates clear, actionable development plans.",
+    max_turns=1
+)
+
 
 async def decompose_task(
     task: str, 
@@ -61,13 +69,8 @@ steps:
     tools_needed: ["Write"]
 ```"""
     
-    options = ClaudeCodeOptions(
-        system_prompt="You are an expert software architect who creates clear, actionable development plans.",
-        max_turns=1
-    )
-    
     try:
-        result = await parse_yaml_response(prompt, options)
+        result = await parse_yaml_response(prompt, _DECOMPOSE_OPTIONS, schema=plan_response)
         
         if isinstance(result, dict):
             if "error" in result:
@@ -143,6 +146,52 @@ def create_default_plan(task: str) -> List[Dict[str, Any]]:
     ]
 
 
+def _topo_sort(steps: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Order steps dependencies-first with an iterative Kahn's algorithm.
+
+    One id -> step dict replaces the per-visit linear scans of the old
+    recursive sort, the explicit queue removes recursion-depth limits,
+    and cycle detection falls out for free: any step never reaching
+    indegree zero is part of a cycle. Unknown dependency ids are ignored
+    here — validate_plan reports those separately.
+
+    Args:
+        steps: List of step dictionaries
+
+    Returns:
+        Tuple of (ordered steps, True if a dependency cycle exists);
+        on a cycle the unorderable steps are appended in input order
+    """
+    id_to_step = {step["id"]: step for step in steps if "id" in step}
+    indegree = {step_id: 0 for step_id in id_to_step}
+    dependents = {step_id: [] for step_id in id_to_step}
+
+    for step_id, step in id_to_step.items():
+        for dep in step.get("dependencies", []):
+            if dep in id_to_step:
+                indegree[step_id] += 1
+                dependents[dep].append(step_id)
+
+    queue = deque(step_id for step_id in id_to_step if indegree[step_id] == 0)
+    ordered = []
+    while queue:
+        step_id = queue.popleft()
+        ordered.append(id_to_step[step_id])
+        for dependent in dependents[step_id]:
+            indegree[dependent] -= 1
+            if indegree[dependent] == 0:
+                queue.append(dependent)
+
+    has_cycle = len(ordered) != len(id_to_step)
+    if has_cycle:
+        placed = {step["id"] for step in ordered}
+        ordered.extend(
+            step for step_id, step in id_to_step.items() if step_id not in placed
+        )
+    return ordered, has_cycle
+
+
 async def prioritize_steps(steps: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """
     Prioritize steps based on dependencies and importance.
@@ -153,33 +202,8 @@ async def prioritize_steps(steps: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     Returns:
         Prioritized list of steps
     """
-    # Build dependency graph
-    dep_graph = {}
-    for step in steps:
-        step_id = step["id"]
-        deps = step.get("dependencies", [])
-        dep_graph[step_id] = deps
-    
-    # Topological sort
-    sorted_steps = []
-    visited = set()
-    
-    def visit(step_id):
-        if step_id in visited:
-            return
-        visited.add(step_id)
-        
-        for dep in dep_graph.get(step_id, []):
-            visit(dep)
-        
-        step = next((s for s in steps if s["id"] == step_id), None)
-        if step and step not in sorted_steps:
-            sorted_steps.append(step)
-    
-    for step in steps:
-        visit(step["id"])
-    
-    return sorted_steps
+    ordered, _ = _topo_sort(steps)
+    return ordered
 
 
 async def estimate_complexity(task: str, steps: List[Dict[str, Any]]) -> Dict[str, Any]:
@@ -270,34 +294,8 @@ def validate_plan(steps: List[Dict[str, Any]]) -> Dict[str, Any]:
                 validation["issues"].append(f"Step {step.get('id')} has invalid dependency: {dep}")
                 validation["is_valid"] = False
     
-    # Check for circular dependencies
-    def has_cycle(graph):
-        visited = set()
-        rec_stack = set()
-        
-        def visit(node):
-            if node in rec_stack:
-                return True
-            if node in visited:
-                return False
-            
-            visited.add(node)
-            rec_stack.add(node)
-            
-            for neighbor in graph.get(node, []):
-                if visit(neighbor):
-                    return True
-            
-            rec_stack.remove(node)
-            return False
-        
-        for node in graph:
-            if visit(node):
-                return True
-        return False
-    
-    dep_graph = {step["id"]: step.get("dependencies", []) for step in steps if "id" in step}
-    if has_cycle(dep_graph):
+    # Check for circular dependencies via the same Kahn pass the sort uses
+    if _topo_sort(steps)[1]:
         validation["issues"].append("Circular dependency detected")
         validation["is_valid"] = False
     